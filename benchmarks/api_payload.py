@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Rations - API Payload Benchmark
+Builds /api/analytics payloads for one guild over several windows and
+compares today's row format with the columnar format: body size raw, gzip
+and brotli (when installed), and the time to encode each.
+
+Usage: python benchmarks/api_payload.py [runs]
+"""
+
+import gzip
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from config import Config
+from src.database import sql_timestamp
+from src.response_format import brotli, columnar_payload
+
+GUILD_ID = 123456789012345678
+WINDOWS = (7, 30, 365)
+
+
+def build_payload(days, seed=42):
+    """Payload shaped like api_analytics: 5-minute snapshots plus channel, user and anomaly rows"""
+    rng = random.Random(seed)
+    now = datetime.now().replace(second=0, microsecond=0)
+    members = 25000
+    server_analytics = []
+    for tick in range(days * 288):
+        members += rng.choice((-1, 0, 0, 1, 1))
+        server_analytics.append({
+            'id': 10_000_000 - tick,
+            'guild_id': GUILD_ID,
+            'member_count': members,
+            'channel_count': 48,
+            'message_count': rng.randrange(0, 400),
+            'voice_minutes': rng.randrange(0, 900),
+            'timestamp': sql_timestamp(now - timedelta(minutes=5 * tick))
+        })
+    return {
+        'server_analytics': server_analytics,
+        'message_analytics': [
+            {'channel_id': GUILD_ID + channel, 'message_count': rng.randrange(100, 50000),
+             'avg_length': rng.uniform(10, 120), 'p50': 24.0, 'p90': 96.0, 'p99': 310.0}
+            for channel in range(50)
+        ],
+        'message_length_percentiles': {'p50': 24.0, 'p90': 96.0, 'p99': 310.0},
+        'user_activity': [
+            {'user_id': rng.randrange(10**17, 10**18), 'activity_type': kind,
+             'activity_count': rng.randrange(1, 500), 'total_duration': rng.randrange(0, 10**6)}
+            for kind in ('voice_join', 'voice_leave') for _ in range(1000)
+        ],
+        'anomalies': [
+            {'guild_id': GUILD_ID, 'channel_id': None, 'kind': 'messages', 'observed': 80, 'expected': 12.5,
+             'score': 6.1, 'bucket_seconds': 60, 'timestamp': sql_timestamp(now - timedelta(hours=hour))}
+            for hour in range(50)
+        ]
+    }
+
+
+def encode(app, payload, columnar):
+    if columnar:
+        payload = columnar_payload(payload)
+    return app.json.dumps(payload).encode('utf-8')
+
+
+def best_time(function, runs):
+    best = float('inf')
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run(runs):
+    # Same JSON provider settings jsonify uses in production
+    app = Flask(__name__)
+    encodings = ['raw', 'gzip'] + (['br'] if brotli is not None else [])
+    print(f"Sizes in KB ({', '.join(encodings)}); times are the best of {runs} runs"
+          + ('' if brotli is not None else ' (install brotli to include br)'))
+
+    for days in WINDOWS:
+        payload = build_payload(days)
+        print(f"\n{days}-day window, {len(payload['server_analytics']):,} snapshots")
+        for label, columnar in (('rows', False), ('columnar', True)):
+            encode_time, body = best_time(lambda: encode(app, payload, columnar), runs)
+            gzip_time, gzipped = best_time(lambda: gzip.compress(body, compresslevel=Config.API_GZIP_LEVEL), runs)
+            sizes = [len(body), len(gzipped)]
+            line = f"gzip {gzip_time * 1000:6.1f} ms"
+            if brotli is not None:
+                br_time, compressed = best_time(lambda: brotli.compress(body, quality=Config.API_BROTLI_QUALITY), runs)
+                sizes.append(len(compressed))
+                line += f", br {br_time * 1000:6.1f} ms"
+            print(f"  {label:>8}: " + ' / '.join(f"{size / 1024:8.1f}" for size in sizes)
+                  + f" KB; encode {encode_time * 1000:6.1f} ms, {line}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Rations - Cold Archive Benchmark
+Fills a scratch database with months of history, moves everything past the
+retention window into the columnar archive, and reports archive time, size
+on disk versus the SQLite rows it replaced, and how long year-long queries
+take when they span both tiers.
+
+Usage: python benchmarks/archive_tier.py [guilds] [messages_per_guild] [days_of_history]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import Database, sql_timestamp
+
+RETENTION_DAYS = 30
+
+
+def populate(database, guilds, messages_per_guild, days, seed=42):
+    """Messages, 5-minute collection ticks and voice sessions spread over `days`"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    conn = database.get_connection()
+
+    for guild_id in range(1, guilds + 1):
+        conn.executemany(
+            '''INSERT INTO server_analytics (guild_id, member_count, channel_count, message_count, voice_minutes, timestamp)
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            [
+                (guild_id, 5000 + tick // 100, 20, rng.randrange(100), rng.randrange(60),
+                 sql_timestamp(now - timedelta(minutes=5 * tick)))
+                for tick in range(days * 288)
+            ]
+        )
+        conn.executemany(
+            '''INSERT INTO user_activity (guild_id, user_id, activity_type, channel_id, duration, timestamp)
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            [
+                (guild_id, rng.randrange(2000), kind, guild_id * 100 + 50, duration,
+                 sql_timestamp(now - timedelta(seconds=rng.randrange(days * 86400))))
+                for kind, duration in [('voice_join', 0), ('voice_leave', 1800)] * 2000
+            ]
+        )
+        database.log_message_batch([
+            (guild_id, guild_id * 100 + rng.randrange(20), rng.randrange(2000), int(rng.lognormvariate(3.2, 0.9)),
+             sql_timestamp(now - timedelta(seconds=rng.randrange(days * 86400))))
+            for _ in range(messages_per_guild)
+        ])
+    conn.commit()
+
+
+def live_bytes(database):
+    """Bytes of SQLite pages in use (free pages excluded)"""
+    conn = database.get_connection()
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    pages = conn.execute('PRAGMA page_count').fetchone()[0] - conn.execute('PRAGMA freelist_count').fetchone()[0]
+    return pages * page_size
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def time_queries(database, guild_ids, days):
+    started = time.perf_counter()
+    for guild_id in guild_ids:
+        database.get_server_summary(guild_id, days)
+        database.get_message_analytics(guild_id, days)
+        database.get_hourly_message_counts(guild_id, days)
+    return (time.perf_counter() - started) / len(guild_ids)
+
+
+def run(guilds, messages_per_guild, days):
+    with tempfile.TemporaryDirectory() as workdir:
+        database = Database(os.path.join(workdir, 'bench.db'), archive_dir=os.path.join(workdir, 'archive'),
+                            retention_days=RETENTION_DAYS)
+        populate(database, guilds, messages_per_guild, days)
+        guild_ids = list(range(1, guilds + 1))
+        print(f"{guilds} guilds, {guilds * messages_per_guild:,} messages over {days} days "
+              f"(retention {RETENTION_DAYS} days)")
+
+        before = live_bytes(database)
+        live_query = time_queries(database, guild_ids, 365)
+
+        started = time.perf_counter()
+        archived = database.cleanup_old_data(RETENTION_DAYS)
+        elapsed = time.perf_counter() - started
+
+        after = live_bytes(database)
+        archive_size = directory_bytes(os.path.join(workdir, 'archive'))
+        print(f"Archived {archived:,} rows in {elapsed:.2f}s")
+        print(f"SQLite pages in use: {before / 2**20:.1f} MB -> {after / 2**20:.1f} MB; "
+              f"archive files {archive_size / 2**20:.2f} MB "
+              f"({(before - after) / max(archive_size, 1):.0f}x smaller than the rows they replaced)")
+        print(f"Year-long summary + channels + hourly per guild: {live_query * 1000:.1f} ms all-live, "
+              f"{time_queries(database, guild_ids, 365) * 1000:.1f} ms live + archive")
+
+
+if __name__ == "__main__":
+    guild_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    message_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    history_days = int(sys.argv[3]) if len(sys.argv) > 3 else 180
+    run(guild_count, message_count, history_days)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Rations - Bot Memory Benchmark
+Loads N synthetic guilds into discord.py's cache, once with RationsBot's slim
+cache profile and once with a stock commands.Bot, and reports RSS per guild
+count. Each measurement runs in a fresh interpreter.
+
+Usage: python benchmarks/bot_memory.py [guild counts ...]
+"""
+
+import gc
+import os
+import subprocess
+import sys
+
+# Add project root to Python path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+MEMBERS_PER_GUILD = 50
+CHANNELS_PER_GUILD = 20
+EMOJIS_PER_GUILD = 10
+VOICE_MEMBERS_PER_GUILD = 3
+
+
+def guild_payload(guild_id):
+    """A trimmed GUILD_CREATE payload"""
+    base = guild_id * 10_000
+    return {
+        'id': str(guild_id),
+        'name': f'Guild {guild_id}',
+        'member_count': 1000,
+        'roles': [{'id': str(guild_id), 'name': '@everyone', 'permissions': '0', 'position': 0}],
+        'channels': [
+            {'id': str(base + i), 'type': 0, 'name': f'channel-{i}', 'position': i}
+            for i in range(CHANNELS_PER_GUILD)
+        ],
+        'members': [
+            {'user': {'id': str(base + 1000 + i), 'username': f'user{i}', 'discriminator': '0', 'avatar': None},
+             'roles': [], 'joined_at': '2024-01-01T00:00:00+00:00', 'flags': 0}
+            for i in range(MEMBERS_PER_GUILD)
+        ],
+        'emojis': [{'id': str(base + 5000 + i), 'name': f'emoji{i}'} for i in range(EMOJIS_PER_GUILD)],
+        'voice_states': [],
+    }
+
+
+def measure(profile, guilds):
+    """Child process: build the cache and print RSS in bytes"""
+    import discord
+    from discord.ext import commands
+    from src.guild_state import GuildStateRegistry, current_rss_bytes
+
+    if profile == 'slim':
+        from src.bot import RationsBot
+        bot = RationsBot()
+    else:
+        intents = discord.Intents.default()
+        intents.members = True
+        bot = commands.Bot(command_prefix='!', intents=intents)
+
+    states = getattr(bot, 'guild_states', GuildStateRegistry())
+    for guild_id in range(1, guilds + 1):
+        bot._connection._add_guild_from_data(guild_payload(guild_id))
+        voice_sessions = states.get(guild_id).voice_sessions
+        for user in range(VOICE_MEMBERS_PER_GUILD):
+            voice_sessions[user] = 1_700_000_000.0
+
+    gc.collect()
+    print(current_rss_bytes())
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [100, 500, 1000, 2000, 5000]
+    baseline = {}
+
+    print(f"{'guilds':>8} {'stock MB':>10} {'slim MB':>10} {'slim KB/guild':>14}")
+    for guilds in counts:
+        row = {}
+        for profile in ('stock', 'slim'):
+            result = subprocess.run(
+                [sys.executable, __file__, '--child', profile, str(guilds)],
+                capture_output=True, text=True, cwd=PROJECT_ROOT
+            )
+            if result.returncode != 0:
+                print(result.stderr)
+                sys.exit(1)
+            row[profile] = int(result.stdout.strip())
+
+        baseline.setdefault('slim', (guilds, row['slim']))
+        first_guilds, first_rss = baseline['slim']
+        per_guild = (row['slim'] - first_rss) / (guilds - first_guilds) / 1024 if guilds != first_guilds else 0
+        print(f"{guilds:>8} {row['stock'] / 2**20:>10.1f} {row['slim'] / 2**20:>10.1f} {per_guild:>14.1f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == '--child':
+        measure(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Rations - Activity Heatmap Benchmark
+Fills a scratch database with a month of hourly message rollups and voice
+sessions for one large guild, then times an uncached heatmap recompute.
+
+Usage: python benchmarks/heatmap.py [voice_sessions] [runs]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import Database, split_voice_session, sql_timestamp
+from src.heatmap import compute_activity_heatmap
+
+GUILD_ID = 1
+
+
+def populate(database, voice_sessions, seed=42):
+    """30 days x 50 channels x 24 hours of message rollups plus voice sessions"""
+    rng = random.Random(seed)
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=30)
+    conn = database.get_connection()
+
+    conn.executemany(
+        'INSERT INTO message_length_histograms (guild_id, channel_id, hour, bucket, count) VALUES (?, ?, ?, ?, ?)',
+        (
+            (GUILD_ID, channel, sql_timestamp(start + timedelta(hours=hour)), bucket, rng.randrange(1, 40))
+            for hour in range(30 * 24)
+            for channel in range(50)
+            for bucket in rng.sample(range(1, 60), 4)
+        )
+    )
+    for _ in range(voice_sessions):
+        left_at = start + timedelta(seconds=rng.randrange(30 * 86400))
+        conn.executemany(
+            'INSERT INTO voice_minutes_hourly (guild_id, hour, minutes) VALUES (?, ?, ?) '
+            'ON CONFLICT (guild_id, hour) DO UPDATE SET minutes = minutes + excluded.minutes',
+            [(GUILD_ID, hour, minutes)
+             for hour, minutes in split_voice_session(left_at, int(rng.expovariate(1 / 2400)))]
+        )
+    conn.commit()
+
+
+def run(voice_sessions, runs):
+    with tempfile.TemporaryDirectory() as workdir:
+        database = Database(os.path.join(workdir, 'bench.db'))
+        populate(database, voice_sessions)
+
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            heatmap = compute_activity_heatmap(database, GUILD_ID, days=30)
+            timings.append(time.perf_counter() - started)
+
+        timings.sort()
+        print(f"Heatmap over 30 days of rollups and {voice_sessions:,} voice sessions")
+        print(f"Recompute: median {timings[len(timings) // 2] * 1000:.1f} ms, "
+              f"best {timings[0] * 1000:.1f} ms over {runs} runs")
+        print(f"Peak message hour: {heatmap['peak_message_hour']}, "
+              f"peak voice hour: {heatmap['peak_voice_hour']}")
+
+
+if __name__ == "__main__":
+    session_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    run_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    run(session_count, run_count)
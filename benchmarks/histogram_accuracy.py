@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Rations - Message Length Histogram Accuracy Check
+Compares histogram percentile estimates against exact percentiles computed
+from the raw lengths. Exits non-zero if any estimate is outside tolerance.
+"""
+
+import math
+import random
+import sys
+import os
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.histogram import LengthHistogram
+
+# Half a bucket width (2 ** (1 / 8) ~ 9%) plus rounding slack for short messages
+RELATIVE_TOLERANCE = 0.05
+ABSOLUTE_TOLERANCE = 1
+
+
+def exact_percentile(sorted_lengths, p):
+    """Nearest-rank percentile over sorted raw values"""
+    rank = max(1, math.ceil(p / 100 * len(sorted_lengths)))
+    return sorted_lengths[rank - 1]
+
+
+def generate_lengths(rng, count):
+    """Mostly short chat messages with a long tail of pastes"""
+    lengths = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < 0.05:
+            lengths.append(0)
+        elif roll < 0.97:
+            lengths.append(min(2000, int(rng.lognormvariate(3.2, 0.9))))
+        else:
+            lengths.append(rng.randint(1500, 4000))
+    return lengths
+
+
+def main():
+    rng = random.Random(1234)
+    failures = 0
+
+    for count in (10, 1000, 100000):
+        lengths = generate_lengths(rng, count)
+
+        # Split across "hours" and merge, as the database does
+        merged = LengthHistogram()
+        for start in range(0, count, 97):
+            hour = LengthHistogram()
+            for length in lengths[start:start + 97]:
+                hour.add(length)
+            merged.merge(hour)
+
+        ordered = sorted(lengths)
+        for p in (50, 90, 99):
+            exact = exact_percentile(ordered, p)
+            estimate = merged.percentile(p)
+            allowed = max(ABSOLUTE_TOLERANCE, exact * RELATIVE_TOLERANCE)
+            ok = abs(estimate - exact) <= allowed
+            failures += not ok
+            print(f"n={count:<7} p{p:<3} exact={exact:<6} estimate={estimate:<8.1f} {'ok' if ok else 'FAIL'}")
+
+    if failures:
+        print(f"❌ {failures} percentile estimates outside tolerance")
+        sys.exit(1)
+    print("✅ All percentile estimates within tolerance")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Rations - Import Time Budget Check
+Imports each module in a fresh interpreter with `-X importtime`, compares the
+cumulative import time against its budget, and checks that importing leaves
+no database file behind. Exits non-zero on any violation.
+
+Usage: python benchmarks/import_time.py [module ...]
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time budgets in milliseconds (best of RUNS)
+IMPORT_BUDGETS_MS = {
+    'src.database': 100,
+    'src.live': 200,
+    'src.web_app': 1500,
+    'src.bot': 2500,
+}
+RUNS = 3
+
+
+def measure(module):
+    """Import `module` in a clean interpreter; returns (milliseconds, side effects)"""
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(os.environ, PYTHONPATH=PROJECT_ROOT, PYTHONDONTWRITEBYTECODE='1')
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+        cumulative_us = None
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            _, cumulative, name = line.split('|')
+            if name.strip() == module:
+                cumulative_us = int(cumulative)
+
+        side_effects = sorted(os.listdir(workdir))
+        return cumulative_us / 1000, side_effects
+
+
+def main():
+    modules = sys.argv[1:] or list(IMPORT_BUDGETS_MS)
+    failures = 0
+
+    for module in modules:
+        budget = IMPORT_BUDGETS_MS.get(module)
+        try:
+            runs = [measure(module) for _ in range(RUNS)]
+        except RuntimeError as e:
+            print(f"❌ {module}: import failed ({e})")
+            failures += 1
+            continue
+
+        best = min(ms for ms, _ in runs)
+        side_effects = sorted({name for _, names in runs for name in names})
+
+        ok = budget is None or best <= budget
+        status = '✅' if ok and not side_effects else '❌'
+        budget_text = f"budget {budget} ms" if budget is not None else "no budget"
+        print(f"{status} {module}: {best:.1f} ms ({budget_text})")
+        if side_effects:
+            print(f"   created files at import: {', '.join(side_effects)}")
+
+        failures += (not ok) + bool(side_effects)
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
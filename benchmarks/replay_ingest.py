@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Rations - Ingest Pipeline Benchmark
+Generates a synthetic gateway event log, replays it at maximum speed through
+RationsBot's handlers into a scratch database and reports events per second.
+
+Usage: python benchmarks/replay_ingest.py [events] [guilds]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.replay import EventRecorder, ReplayEngine, read_events, MESSAGE_EVENT, VOICE_EVENT
+
+
+def write_synthetic_log(path, events, guilds, seed=42):
+    """Mostly messages with a sprinkling of voice joins and leaves"""
+    rng = random.Random(seed)
+    recorder = EventRecorder(path)
+    ts = 1_700_000_000.0
+    in_voice = {}
+
+    for _ in range(events):
+        ts += rng.expovariate(20)
+        guild_id = rng.randrange(guilds) + 1
+        user_id = rng.randrange(5000) + 1
+        if rng.random() < 0.97:
+            recorder.write_event([MESSAGE_EVENT, ts, guild_id, guild_id * 100 + rng.randrange(20),
+                                  user_id, int(rng.lognormvariate(3.2, 0.9))])
+        elif (guild_id, user_id) in in_voice:
+            recorder.write_event([VOICE_EVENT, ts, guild_id, user_id, in_voice.pop((guild_id, user_id)), None])
+        else:
+            channel_id = guild_id * 100 + 50
+            in_voice[(guild_id, user_id)] = channel_id
+            recorder.write_event([VOICE_EVENT, ts, guild_id, user_id, None, channel_id])
+
+    recorder.close()
+
+
+async def run(events, guilds):
+    with tempfile.TemporaryDirectory() as workdir:
+        log_path = os.path.join(workdir, 'events.jsonl.gz')
+        write_synthetic_log(log_path, events, guilds)
+
+        from src.database import db
+        db.db_path = os.path.join(workdir, 'bench.db')
+
+        from src.bot import bot
+        stats = await ReplayEngine(bot).replay(read_events(log_path))
+
+        print(f"Replayed {stats['messages']:,} messages + {stats['voice_events']:,} voice events "
+              f"across {guilds} guilds in {stats['seconds']:.2f}s")
+        print(f"Ingest throughput: {stats['events_per_second']:,.0f} events/s")
+
+
+if __name__ == "__main__":
+    event_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    guild_count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    asyncio.run(run(event_count, guild_count))
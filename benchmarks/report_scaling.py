@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Rations - Batch Report Scaling Benchmark
+Builds a scratch database with many guilds' worth of analytics, then times
+the cross-guild report at 1, 2, 4 and 8 worker processes. Speedup is capped
+by the number of CPU cores available.
+
+Usage: python benchmarks/report_scaling.py [guilds] [messages_per_guild]
+"""
+
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import Database, sql_timestamp
+from src.reports import generate_reports
+
+WORKER_COUNTS = (1, 2, 4, 8)
+CHANNELS_PER_GUILD = 20
+
+
+def populate(database, guilds, messages_per_guild, seed=42):
+    """A day of collection ticks and messages for every guild"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    conn = database.get_connection()
+
+    for guild_id in range(1, guilds + 1):
+        members = rng.randrange(100, 50_000)
+        conn.executemany(
+            '''INSERT INTO server_analytics (guild_id, member_count, channel_count, message_count, voice_minutes, timestamp)
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            [
+                (guild_id, members + tick * rng.randrange(-2, 5), CHANNELS_PER_GUILD,
+                 messages_per_guild // 288, rng.randrange(60), sql_timestamp(now - timedelta(minutes=5 * tick)))
+                for tick in range(288)
+            ]
+        )
+        database.log_message_batch([
+            (guild_id, guild_id * 100 + int(rng.paretovariate(1.2)) % CHANNELS_PER_GUILD, rng.randrange(members),
+             int(rng.lognormvariate(3.2, 0.9)), sql_timestamp(now - timedelta(seconds=rng.randrange(86400))))
+            for _ in range(messages_per_guild)
+        ])
+    conn.commit()
+
+
+def run(guilds, messages_per_guild):
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'bench.db')
+        populate(Database(db_path), guilds, messages_per_guild)
+        print(f"{guilds} guilds, {guilds * messages_per_guild:,} messages, {os.cpu_count()} CPU cores")
+
+        baseline = None
+        for workers in WORKER_COUNTS:
+            report = generate_reports(db_path, days=1, workers=workers)
+            baseline = baseline or report['seconds']
+            print(f"  {workers} worker{'s' if workers > 1 else ' '}: {report['seconds']:6.2f}s "
+                  f"({baseline / report['seconds']:.1f}x, {report['guild_count']} guilds reported)")
+
+
+if __name__ == "__main__":
+    guild_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    message_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    run(guild_count, message_count)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Rations - Sampled Ingestion Benchmark
+Feeds guilds of increasing size through the bot's message path (rate
+counters, ingestion policy, weighted writes), then compares the rows written
+per minute and the estimated per-channel counts from get_message_analytics
+with the true counts and their reported standard errors.
+
+Usage: python benchmarks/sampled_ingest.py [minutes] [max_per_minute]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import Database
+from src.guild_state import GuildStateRegistry
+from src.ingestion import IngestionPolicy
+
+GUILD_RATES = (100, 1000, 5000, 20000)  # messages per minute
+CHANNELS = 8
+
+
+def simulate(database, minutes, max_per_minute, seed=7):
+    rng = random.Random(seed)
+    registry = GuildStateRegistry()
+    policy = IngestionPolicy(max_per_minute=max_per_minute, rng=random.Random(seed + 1))
+    # Channel popularity falls off like 1/rank
+    channel_weights = [1 / rank for rank in range(1, CHANNELS + 1)]
+    start = (datetime.now(timezone.utc) - timedelta(minutes=minutes + 1)).timestamp()
+
+    truth = {}
+    writes = {}
+    rows = []
+    for guild_id, rate in enumerate(GUILD_RATES, start=1):
+        ts = start
+        channels = rng.choices(range(CHANNELS), weights=channel_weights, k=rate * minutes)
+        for channel in channels:
+            ts += rng.expovariate(rate / 60)
+            channel_id = guild_id * 100 + channel
+            registry.observe_message(guild_id, channel_id, ts)
+            truth[(guild_id, channel_id)] = truth.get((guild_id, channel_id), 0) + 1
+            weight = policy.weight(guild_id, registry.get(guild_id).messages_per_minute(ts, policy.window_minutes))
+            if weight is not None:
+                rows.append((guild_id, channel_id, rng.randrange(1, 200), ts, weight))
+                writes[guild_id] = writes.get(guild_id, 0) + 1
+
+    started = time.perf_counter()
+    for guild_id, channel_id, length, ts, weight in rows:
+        database.log_message_activity(guild_id, channel_id, 1, length,
+                                      timestamp=datetime.fromtimestamp(ts, timezone.utc), weight=weight)
+    return truth, writes, time.perf_counter() - started
+
+
+def run(minutes, max_per_minute):
+    print(f"{len(GUILD_RATES)} guilds over {minutes} minutes, sampling above {max_per_minute:,} messages/minute")
+    with tempfile.TemporaryDirectory() as workdir:
+        database = Database(os.path.join(workdir, 'sampled.db'))
+        truth, writes, seconds = simulate(database, minutes, max_per_minute)
+        print(f"  {sum(writes.values()):,} rows written in {seconds:.1f} s")
+
+        within = total = 0
+        for guild_id, rate in enumerate(GUILD_RATES, start=1):
+            channels = database.get_message_analytics(guild_id, days=1)
+            true_total = sum(count for (guild, _), count in truth.items() if guild == guild_id)
+            estimate = sum(channel['message_count'] for channel in channels)
+            stderr = sum(channel['message_count_stderr'] ** 2 for channel in channels) ** 0.5
+            for channel in channels:
+                error = abs(channel['message_count'] - truth[(guild_id, channel['channel_id'])])
+                within += error <= 2 * channel['message_count_stderr'] + 0.5
+                total += 1
+            print(f"  {rate:>6,}/min: {writes[guild_id] / minutes:>6,.0f} writes/min, "
+                  f"true {true_total:>9,}, estimated {estimate:>9,} ± {stderr:,.0f} "
+                  f"({(estimate - true_total) / true_total:+.2%})")
+        print(f"  {within}/{total} channel counts within 2 standard errors")
+
+
+if __name__ == "__main__":
+    minutes_arg = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    max_arg = int(sys.argv[2]) if len(sys.argv) > 2 else 600
+    run(minutes_arg, max_arg)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Rations - Snapshot Span Benchmark
+Simulates a week of collection for a mix of idle, active and busy guilds,
+once the old way (a server_analytics row per guild every 5 minutes) and once
+with adaptive cadence and run-length spans, then compares rows, writes,
+database size and the time to read the series back.
+
+Usage: python benchmarks/snapshot_spans.py [guilds] [days]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from src.collection import CollectionPolicy, store_snapshot
+from src.database import Database
+from src.guild_state import GuildStateRegistry
+
+TICK = 60  # the collection loop's resolution
+
+
+class SimulatedGuild:
+    """Member count drifts now and then; message rate depends on the guild's kind"""
+
+    def __init__(self, guild_id, kind, rng):
+        self.guild_id = guild_id
+        self.kind = kind
+        self.rng = rng
+        self.members = rng.randrange(50, 50000)
+        self.messages_per_hour = {'idle': 0, 'active': rng.randrange(20, 200), 'busy': rng.randrange(400, 2000)}[kind]
+
+    def advance(self):
+        # About one member change an hour, fewer in idle guilds
+        if self.rng.random() < (0.002 if self.kind == 'idle' else 0.02):
+            self.members += self.rng.choice((-1, 1))
+
+    def snapshot(self):
+        messages = int(self.messages_per_hour * self.rng.uniform(0.8, 1.2))
+        return (self.members, 12, messages, 0)
+
+
+def make_guilds(count, seed=42):
+    rng = random.Random(seed)
+    kinds = ['idle'] * 80 + ['active'] * 15 + ['busy'] * 5
+    return [SimulatedGuild(guild_id, kinds[guild_id % 100], rng) for guild_id in range(1, count + 1)]
+
+
+def count_writes(database):
+    """Wrap the two write calls so we can count statements"""
+    counts = {'inserts': 0, 'updates': 0}
+    insert, extend = database.log_server_analytics, database.extend_server_span
+
+    def counted_insert(*args, **kwargs):
+        counts['inserts'] += 1
+        return insert(*args, **kwargs)
+
+    def counted_extend(*args, **kwargs):
+        counts['updates'] += 1
+        return extend(*args, **kwargs)
+
+    database.log_server_analytics, database.extend_server_span = counted_insert, counted_extend
+    return counts
+
+
+def simulate(database, guilds, days, adaptive):
+    counts = count_writes(database)
+    registry = GuildStateRegistry(collection_policy=CollectionPolicy(
+        base_interval=Config.ANALYTICS_UPDATE_INTERVAL,
+        min_interval=Config.ANALYTICS_MIN_INTERVAL,
+        max_interval=Config.ANALYTICS_MAX_INTERVAL,
+        busy_messages=Config.ANALYTICS_BUSY_MESSAGES
+    ))
+    start = int((datetime.now(timezone.utc) - timedelta(days=days)).timestamp()) // TICK * TICK
+
+    started = time.perf_counter()
+    for now in range(start, start + days * 86400, TICK):
+        for guild in guilds:
+            guild.advance()
+            if adaptive:
+                schedule = registry.collection(guild.guild_id)
+                if schedule.due(now):
+                    store_snapshot(database, guild.guild_id, schedule, now, guild.snapshot())
+            elif (now - start) % Config.ANALYTICS_UPDATE_INTERVAL == 0:
+                members, channels, messages, voice = guild.snapshot()
+                database.log_server_analytics(guild.guild_id, members, channels, messages, voice,
+                                              timestamp=datetime.fromtimestamp(now, timezone.utc))
+    elapsed = time.perf_counter() - started
+
+    conn = database.get_connection()
+    rows = conn.execute('SELECT COUNT(*) FROM server_analytics').fetchone()[0]
+    rows_by_kind = {}
+    for guild_id, count in conn.execute('SELECT guild_id, COUNT(*) FROM server_analytics GROUP BY guild_id'):
+        kind = guilds[guild_id - 1].kind
+        rows_by_kind[kind] = rows_by_kind.get(kind, 0) + count
+    size = conn.execute('PRAGMA page_count').fetchone()[0] * conn.execute('PRAGMA page_size').fetchone()[0]
+
+    started = time.perf_counter()
+    points = sum(len(database.get_server_analytics(guild.guild_id, days)) for guild in guilds)
+    query = (time.perf_counter() - started) / len(guilds)
+    return {'rows': rows, 'rows_by_kind': rows_by_kind, 'writes': counts['inserts'] + counts['updates'], 'bytes': size, 'points': points,
+            'seconds': elapsed, 'query': query}
+
+
+def run(guild_count, days):
+    print(f"{guild_count} guilds (80% idle, 15% active, 5% busy) over {days} days")
+    with tempfile.TemporaryDirectory() as workdir:
+        for label, adaptive in (('Fixed 5-minute rows', False), ('Adaptive spans', True)):
+            database = Database(os.path.join(workdir, f'{label[0]}.db'))
+            result = simulate(database, make_guilds(guild_count), days, adaptive)
+            print(f"{label:>20}: {result['rows']:>8,} rows, {result['writes']:>8,} writes, "
+                  f"{result['bytes'] / 2**20:5.1f} MB, {result['points']:>9,} points read back "
+                  f"in {result['query'] * 1000:.1f} ms/guild")
+            print(f"{'':>20}  rows by guild kind: " +
+                  ', '.join(f"{kind} {rows:,}" for kind, rows in sorted(result['rows_by_kind'].items())))
+
+
+if __name__ == "__main__":
+    guilds_arg = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    days_arg = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    run(guilds_arg, days_arg)
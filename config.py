@@ -19,5 +19,61 @@ class Config:
     
     # Bot Settings
     BOT_PREFIX = '!'
-    MAX_MESSAGE_HISTORY = 1000
-    ANALYTICS_UPDATE_INTERVAL = 300  # 5 minutes
+    MAX_MESSAGE_HISTORY = int(os.getenv('MAX_MESSAGE_HISTORY', 1000))  # discord.py message cache size, 0 disables it
+    ANALYTICS_UPDATE_INTERVAL = 300  # 5 minutes; snapshot cadence after a change, and spacing of unchanged spans
+    ANALYTICS_MIN_INTERVAL = 60  # busy guilds are sampled this often
+    ANALYTICS_MAX_INTERVAL = 1800  # guilds whose snapshot keeps repeating back off to this
+    ANALYTICS_BUSY_MESSAGES = 300  # messages in the last hour that make a guild busy
+    SUMMARY_CACHE_SIZE = 1000  # guilds with a precomputed /analytics summary
+    STARTUP_READY_TIMEOUT = 30  # seconds start.py waits for the bot to report it is online
+    EVENT_RECORD_PATH = os.getenv('EVENT_RECORD_PATH')  # e.g. events.jsonl.gz to record gateway events for replay
+    
+    # Historical backfill for newly joined guilds
+    BACKFILL_LOOKBACK_DAYS = 7
+    BACKFILL_CONCURRENCY = 4  # channels read at once
+    BACKFILL_REQUESTS_PER_SECOND = 2  # history page requests across all channels
+    BACKFILL_BATCH_SIZE = 500  # messages per write and checkpoint
+    
+    # Streaming anomaly detection (raids and spam bursts)
+    ANOMALY_BUCKET_SECONDS = 60  # rates are events per bucket
+    ANOMALY_ALPHA = 0.1  # EWMA weight of the newest bucket
+    ANOMALY_THRESHOLD = 4.0  # standard deviations above the baseline
+    ANOMALY_MIN_MESSAGES = 20  # smallest message burst worth an alert
+    ANOMALY_MIN_JOINS = 10  # smallest join burst worth an alert
+    ANOMALY_WARMUP_BUCKETS = 10  # buckets of baseline before alerting
+    ANOMALY_MAX_CHANNELS = 32  # per-channel detectors kept per guild (least recently active dropped)
+    TRACK_MEMBER_JOINS = os.getenv('TRACK_MEMBER_JOINS', 'false').lower() == 'true'  # needs the privileged members intent
+    
+    # Sampled message ingestion for very large guilds (stored messages carry weight 1/rate)
+    INGEST_MAX_MESSAGES_PER_MINUTE = int(os.getenv('INGEST_MAX_MESSAGES_PER_MINUTE', 600))  # per guild; busier guilds are sampled down to this, 0 stores everything
+    INGEST_RATE_WINDOW_MINUTES = 5  # recent minutes the message rate is measured over
+    INGEST_SAMPLE_RATES = {int(guild_id): float(rate) for guild_id, rate in (
+        entry.split(':') for entry in os.getenv('INGEST_SAMPLE_RATES', '').split(',') if entry
+    )}  # e.g. 123456789:0.1 stores a fixed 10% of that guild's messages
+    
+    # Data retention
+    DATA_RETENTION_DAYS = 30  # rows older than this leave the live database
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', 'archive')  # compressed per-guild monthly files for aged rows; empty deletes them instead
+    
+    # API responses
+    API_COMPRESS_MIN_BYTES = 1024  # smaller JSON bodies aren't worth compressing
+    API_GZIP_LEVEL = 6
+    API_BROTLI_QUALITY = 5  # used when the optional brotli package is installed and the client accepts br
+    MAX_QUERY_DAYS = 365  # longest window the analytics API accepts
+    QUERY_TIME_BUDGET = float(os.getenv('QUERY_TIME_BUDGET', 5))  # seconds a request's database reads may take before they're interrupted
+    HEAVY_QUERY_DAYS = 30  # longer windows count as heavy (they reach the cold archive)
+    MAX_HEAVY_QUERIES_PER_USER = 1  # concurrent heavy queries, per dashboard process
+    MAX_HEAVY_QUERIES_PER_GUILD = 2
+    
+    # Batch reports (run_reports.py)
+    REPORTS_DIR = os.getenv('REPORTS_DIR', 'reports')  # where JSON/HTML snapshots are written and served from
+    REPORT_DAYS = 1  # daily report window
+    REPORT_WORKERS = os.cpu_count() or 1
+    REPORT_ADMIN_IDS = [user_id for user_id in os.getenv('REPORT_ADMIN_IDS', '').split(',') if user_id]  # Discord user IDs allowed to view reports
+    
+    # Live Dashboard Settings
+    LIVE_POLL_INTERVAL = 5  # seconds between shared database polls
+    LIVE_HEARTBEAT_INTERVAL = 15  # seconds between SSE keep-alives
+    
+    # Local change notifications between the bot and web processes
+    IPC_SOCKET_PATH = os.getenv('RATIONS_IPC_SOCKET', 'rations.sock')
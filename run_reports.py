@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Rations Batch Reports - Main Entry Point
+Run this file (e.g. daily from cron) to write cross-guild report snapshots
+"""
+
+import argparse
+import sys
+import os
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from config import Config
+from src.database import db
+from src.reports import generate_reports, write_snapshots
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate cross-guild analytics report snapshots')
+    parser.add_argument('--database', default=db.db_path, help=f'database to read (default: {db.db_path})')
+    parser.add_argument('--days', type=int, default=Config.REPORT_DAYS, help=f'report window in days (default: {Config.REPORT_DAYS})')
+    parser.add_argument('--workers', type=int, default=Config.REPORT_WORKERS, help=f'worker processes (default: {Config.REPORT_WORKERS})')
+    parser.add_argument('--output', default=Config.REPORTS_DIR, help=f'snapshot directory (default: {Config.REPORTS_DIR})')
+    args = parser.parse_args()
+    
+    if not os.path.exists(args.database):
+        print(f"❌ Database not found: {args.database}")
+        sys.exit(1)
+    
+    report = generate_reports(args.database, days=args.days, workers=args.workers)
+    paths = write_snapshots(report, args.output)
+    
+    print(f"📄 Reported on {report['guild_count']} guilds in {report['seconds']:.2f}s with {report['workers']} worker process(es)")
+    for path in paths:
+        print(f"   {path}")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nReport generation stopped by user")
@@ -0,0 +1,53 @@
+"""
+Admission control for expensive dashboard queries in Rations Discord Analytics Bot
+
+Long windows (the ones that reach the cold archive) are admitted only while
+the requesting user and the guild are each below their cap of concurrent
+heavy queries; anything over is turned away straight away rather than
+queueing behind the SQLite read lock. The counts are per process.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Dict
+
+
+class QueryRejected(Exception):
+    """Too many heavy queries already running for this user or guild"""
+
+    def __init__(self, scope: str):
+        super().__init__(f'too many concurrent heavy queries for this {scope}')
+        self.scope = scope  # 'user' or 'guild'
+
+
+class AdmissionControl:
+    """Counts running heavy queries per user and per guild"""
+
+    def __init__(self, max_per_user: int = 1, max_per_guild: int = 2):
+        self.max_per_user = max_per_user
+        self.max_per_guild = max_per_guild
+        self.users: Dict[str, int] = {}
+        self.guilds: Dict[int, int] = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def admit(self, user_id: str, guild_id: int, heavy: bool = True):
+        """Hold a heavy-query slot for the duration of the block; raises QueryRejected when none is free"""
+        if not heavy:
+            yield
+            return
+
+        with self.lock:
+            if self.users.get(user_id, 0) >= self.max_per_user:
+                raise QueryRejected('user')
+            if self.guilds.get(guild_id, 0) >= self.max_per_guild:
+                raise QueryRejected('guild')
+            self.users[user_id] = self.users.get(user_id, 0) + 1
+            self.guilds[guild_id] = self.guilds.get(guild_id, 0) + 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                for counts, key in ((self.users, user_id), (self.guilds, guild_id)):
+                    counts[key] -= 1
+                    if not counts[key]:
+                        del counts[key]
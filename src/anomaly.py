@@ -0,0 +1,83 @@
+"""
+Streaming rate anomaly detection for Rations Discord Analytics Bot
+"""
+import math
+from typing import Dict, Optional
+
+# Closed buckets replayed after a quiet spell; past this the baseline has decayed anyway
+MAX_IDLE_BUCKETS = 60
+
+
+class RatePolicy:
+    """Detector settings shared by every RateDetector of one kind"""
+
+    def __init__(self, bucket_seconds: float = 60, alpha: float = 0.1, threshold: float = 4.0,
+                 min_events: int = 10, warmup: int = 10):
+        self.bucket_seconds = bucket_seconds
+        self.alpha = alpha  # EWMA weight of the newest bucket
+        self.threshold = threshold  # standard deviations above the mean
+        self.min_events = min_events  # ignore bursts smaller than this
+        self.warmup = warmup  # buckets to learn before alerting
+
+
+class RateDetector:
+    """EWMA mean and variance of events per fixed-width time bucket.
+
+    Each event costs O(1): it bumps the open bucket's count and compares it
+    against the baseline learned from closed buckets, so a burst is flagged
+    while it is still happening rather than when its bucket closes. Only the
+    first crossing in a bucket is reported.
+    """
+
+    __slots__ = ('policy', 'bucket', 'count', 'mean', 'variance', 'seen', 'flagged')
+
+    def __init__(self, policy: RatePolicy):
+        self.policy = policy
+        self.bucket = -1  # index of the open bucket
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+        self.seen = 0  # closed buckets folded into the baseline
+        self.flagged = False
+
+    def observe(self, timestamp: float) -> Optional[Dict]:
+        """Count one event at unix `timestamp`; return the anomaly if this event tips its bucket over"""
+        policy = self.policy
+        bucket = int(timestamp // policy.bucket_seconds)
+        if bucket > self.bucket:
+            if self.bucket >= 0:
+                self._close(self.count)
+                for _ in range(min(bucket - self.bucket - 1, MAX_IDLE_BUCKETS)):
+                    self._close(0)
+            self.bucket = bucket
+            self.count = 0
+            self.flagged = False
+        elif bucket < self.bucket:
+            # Late event for a bucket already folded into the baseline
+            return None
+
+        self.count += 1
+        if self.flagged or self.seen < policy.warmup or self.count < policy.min_events:
+            return None
+
+        # Event counts are at least Poisson-noisy; a calm stretch shouldn't make the baseline brittle
+        std = math.sqrt(max(self.variance, self.mean))
+        score = (self.count - self.mean) / std if std > 0 else math.inf
+        if score < policy.threshold:
+            return None
+
+        self.flagged = True
+        return {
+            'observed': self.count,
+            'expected': round(self.mean, 2),
+            'score': round(score, 2) if math.isfinite(score) else None
+        }
+
+    def _close(self, value: int):
+        # Incremental exponentially weighted mean and variance
+        alpha = self.policy.alpha
+        diff = value - self.mean
+        increment = alpha * diff
+        self.mean += increment
+        self.variance = (1 - alpha) * (self.variance + diff * increment)
+        self.seen += 1
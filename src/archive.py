@@ -0,0 +1,291 @@
+"""
+Cold archive tier for Rations Discord Analytics Bot
+
+Rows past the retention window leave SQLite and land in one file per guild
+per month (`<root>/<guild_id>/<YYYY-MM>.rca`):
+
+    b'RCA1' | header length (uint32 LE) | JSON header | column blocks
+
+Every column of every archived table is its own zlib-compressed block, and
+the header records each block's offset, so readers mmap the file and inflate
+only the columns a query asks for. Times are unix seconds, sorted and stored
+as deltas; text columns are dictionary-encoded.
+"""
+import json
+import mmap
+import os
+import struct
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+MAGIC = b'RCA1'
+HEADER_LENGTH = struct.Struct('<I')
+
+# Archived tables: the time column, then every other column (guild_id is the directory)
+TABLES = {
+    'server_analytics': ('timestamp', {
+        'member_count': '<i8', 'channel_count': '<i8', 'message_count': '<i8', 'voice_minutes': '<i8',
+        'span_count': '<i8', 'sample_interval': '<i8'
+    }),
+    'message_analytics': ('timestamp', {
+        'channel_id': '<i8', 'user_id': '<i8', 'message_length': '<i8', 'weight': '<f8'
+    }),
+    'user_activity': ('timestamp', {
+        'user_id': '<i8', 'activity_type': 'category', 'channel_id': '<i8', 'duration': '<i8'
+    }),
+    'message_length_histograms': ('hour', {
+        'channel_id': '<i8', 'bucket': '<i8', 'count': '<f8'
+    }),
+    'voice_minutes_hourly': ('hour', {
+        'minutes': '<f8'
+    }),
+}
+
+# Columns added after files may already have been written, and the value their rows imply
+COLUMN_DEFAULTS = {
+    ('server_analytics', 'span_count'): 1,
+    ('server_analytics', 'sample_interval'): 300,
+    ('message_analytics', 'weight'): 1.0,
+}
+
+
+def row_ends(table: str, arrays: Dict[str, np.ndarray]) -> np.ndarray:
+    """Time of each row's last point: a snapshot span's final snapshot, otherwise the time column"""
+    if table == 'server_analytics':
+        return arrays['timestamp'] + (arrays['span_count'] - 1) * arrays['sample_interval']
+    return arrays[TABLES[table][0]]
+
+
+def month_of(epoch_seconds: int) -> str:
+    return datetime.fromtimestamp(int(epoch_seconds), timezone.utc).strftime('%Y-%m')
+
+
+def month_start(month: str) -> int:
+    return int(datetime.strptime(month, '%Y-%m').replace(tzinfo=timezone.utc).timestamp())
+
+
+def empty_table(table: str) -> Dict[str, np.ndarray]:
+    time_column, columns = TABLES[table]
+    arrays = {time_column: np.zeros(0, dtype='<i8')}
+    for name, dtype in columns.items():
+        arrays[name] = np.zeros(0, dtype=object if dtype == 'category' else dtype)
+    return arrays
+
+
+def group_totals(keys, weights: Optional[np.ndarray] = None) -> Dict:
+    """Row counts (or sums of `weights`) per distinct key; a list of key columns gives tuple keys"""
+    columns = list(keys) if isinstance(keys, (list, tuple)) else [keys]
+    if columns[0].size == 0:
+        return {}
+    if len(columns) == 1:
+        unique, inverse = np.unique(columns[0], return_inverse=True)
+        labels = unique.tolist()
+    else:
+        unique, inverse = np.unique(np.column_stack(columns), axis=0, return_inverse=True)
+        labels = [tuple(row) for row in unique.tolist()]
+    totals = np.bincount(inverse.ravel(), weights=weights, minlength=len(labels))
+    return dict(zip(labels, totals.tolist()))
+
+
+class ArchiveFile:
+    """Read-only view of one guild-month archive file"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:4] != MAGIC:
+            self.map.close()
+            raise ValueError(f'{path} is not an archive file')
+        (length,) = HEADER_LENGTH.unpack_from(self.map, 4)
+        self.data_start = 8 + length
+        self.header = json.loads(self.map[8:self.data_start])
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def rows(self, table: str) -> int:
+        entry = self.header['tables'].get(table)
+        return entry['rows'] if entry else 0
+
+    def column(self, table: str, name: str) -> np.ndarray:
+        """Inflate a single column"""
+        entry = self.header['tables'].get(table)
+        if entry is None:
+            return empty_table(table)[name]
+
+        block = entry['columns'].get(name)
+        if block is None:
+            return np.full(entry['rows'], COLUMN_DEFAULTS[(table, name)], dtype=TABLES[table][1][name])
+        start = self.data_start + block['offset']
+        raw = zlib.decompress(self.map[start:start + block['length']])
+
+        if block['encoding'] == 'delta':
+            return np.cumsum(np.frombuffer(raw, dtype='<i8'))
+        if block['encoding'] == 'category':
+            codes = np.frombuffer(raw, dtype='<u2')
+            return np.array(block['categories'], dtype=object)[codes]
+        return np.frombuffer(raw, dtype=block['dtype'])
+
+    def read(self, table: str, columns: Iterable[str]) -> Dict[str, np.ndarray]:
+        return {name: self.column(table, name) for name in columns}
+
+
+def write_archive_file(path: str, guild_id: int, month: str, tables: Dict[str, Dict[str, np.ndarray]], until: int):
+    """Encode and atomically write one guild-month file"""
+    blocks: List[bytes] = []
+    offset = 0
+    header = {'version': 1, 'guild_id': guild_id, 'month': month, 'until': until, 'tables': {}}
+
+    for table, arrays in tables.items():
+        time_column, columns = TABLES[table]
+        order = np.argsort(arrays[time_column], kind='stable')
+        entry = {'rows': int(order.size), 'columns': {}}
+
+        for name, dtype in [(time_column, '<i8')] + list(columns.items()):
+            values = arrays[name][order]
+            block = {'dtype': dtype}
+            if name == time_column:
+                block['encoding'] = 'delta'
+                payload = np.diff(values.astype('<i8'), prepend=np.int64(0)).astype('<i8').tobytes()
+            elif dtype == 'category':
+                categories, codes = np.unique(values.astype(str), return_inverse=True)
+                block['encoding'] = 'category'
+                block['categories'] = categories.tolist()
+                payload = codes.astype('<u2').tobytes()
+            else:
+                block['encoding'] = 'plain'
+                payload = np.ascontiguousarray(values, dtype=dtype).tobytes()
+
+            compressed = zlib.compress(payload, 6)
+            block.update(offset=offset, length=len(compressed))
+            entry['columns'][name] = block
+            blocks.append(compressed)
+            offset += len(compressed)
+
+        header['tables'][table] = entry
+
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC + HEADER_LENGTH.pack(len(header_bytes)) + header_bytes)
+        for block in blocks:
+            f.write(block)
+    os.replace(temp_path, path)
+
+
+class ColdArchive:
+    """Per-guild, per-month columnar files under `root`"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, guild_id: int, month: str) -> str:
+        return os.path.join(self.root, str(guild_id), f'{month}.rca')
+
+    def months(self, guild_id: int) -> List[str]:
+        try:
+            names = os.listdir(os.path.join(self.root, str(guild_id)))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-4] for name in names if name.endswith('.rca'))
+
+    def guild_ids(self, since: int) -> List[int]:
+        """Guilds with archived months overlapping [since, now)"""
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        first_month = month_of(since)
+        return sorted(
+            int(name) for name in names
+            if name.isdigit() and any(month >= first_month for month in self.months(int(name)))
+        )
+
+    def append(self, guild_id: int, tables: Dict[str, Dict[str, np.ndarray]], until: int) -> int:
+        """Add rows older than `until` to the guild's month files; returns rows written.
+
+        Month files already holding data are rewritten with the new rows merged
+        in. Rows ending before a file's previous `until` were archived by an
+        earlier run (which then failed before deleting them), so they are
+        skipped rather than stored twice. Snapshot spans end at their last
+        point, so one that reached past an earlier cutoff is still added.
+        """
+        months = set()
+        for table, arrays in tables.items():
+            time_column = TABLES[table][0]
+            months.update(month_of(ts) for ts in np.unique(arrays[time_column] // 86400) * 86400)
+
+        written = 0
+        for month in sorted(months):
+            start = month_start(month)
+            end = month_start(month_of(start + 32 * 86400))
+            path = self.path(guild_id, month)
+
+            existing, previous_until = {}, None
+            if os.path.exists(path):
+                with ArchiveFile(path) as archived:
+                    previous_until = archived.header['until']
+                    for table in archived.header['tables']:
+                        time_column, columns = TABLES[table]
+                        existing[table] = archived.read(table, [time_column, *columns])
+
+            merged = {}
+            for table in TABLES:
+                time_column, columns = TABLES[table]
+                parts = [existing[table]] if table in existing else []
+                if table in tables:
+                    times = tables[table][time_column]
+                    keep = (times >= start) & (times < end)
+                    if previous_until is not None:
+                        keep &= row_ends(table, tables[table]) >= previous_until
+                    if keep.any():
+                        parts.append({name: values[keep] for name, values in tables[table].items()})
+                        written += int(keep.sum())
+                if parts:
+                    merged[table] = {
+                        name: np.concatenate([part[name] for part in parts])
+                        for name in [time_column, *columns]
+                    }
+
+            if merged:
+                write_archive_file(path, guild_id, month, merged, max(until, previous_until or 0))
+        return written
+
+    def read(self, guild_id: int, table: str, columns: Iterable[str], since: int,
+             until: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Selected columns of archived rows with time in [since, until), across months"""
+        time_column = TABLES[table][0]
+        columns = [name for name in columns if name != time_column]
+        first_month = month_of(since)
+        last_month = month_of(until) if until is not None else None
+
+        parts = []
+        for month in self.months(guild_id):
+            if month < first_month or (last_month is not None and month > last_month):
+                continue
+            with ArchiveFile(self.path(guild_id, month)) as archived:
+                if not archived.rows(table):
+                    continue
+                times = archived.column(table, time_column)
+                keep = times >= since
+                if until is not None:
+                    keep &= times < until
+                if keep.any():
+                    part = {name: archived.column(table, name)[keep] for name in columns}
+                    part[time_column] = times[keep]
+                    parts.append(part)
+
+        if not parts:
+            empty = empty_table(table)
+            return {name: empty[name] for name in [time_column, *columns]}
+        return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
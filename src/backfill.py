@@ -0,0 +1,142 @@
+"""
+Historical message backfill for Rations Discord Analytics Bot
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import discord
+
+from src.database import sql_timestamp
+
+# discord.py fetches channel history in pages of this many messages
+HISTORY_PAGE_SIZE = 100
+
+
+class RateLimiter:
+    """Token bucket shared by every channel a backfill is reading"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a request may be made"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Backfiller:
+    """Reads recent channel history for guilds the bot just joined.
+
+    Channels are read concurrently up to `concurrency`, and history requests
+    across all of them share one rate limit. Messages are written in
+    `batch_size` chunks together with a per-channel checkpoint, so an
+    interrupted backfill picks up after the last saved message.
+    """
+
+    def __init__(self, database, lookback_days: int = 7, concurrency: int = 4,
+                 requests_per_second: float = 2.0, batch_size: int = 500, on_batch=None):
+        self.database = database
+        self.lookback_days = lookback_days
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.limiter = RateLimiter(requests_per_second, burst=concurrency)
+        self.batch_size = batch_size
+        self.on_batch = on_batch
+        self.running: Dict[int, asyncio.Task] = {}
+
+    def schedule(self, guild) -> asyncio.Task:
+        """Start (or resume) backfilling a guild unless it is already running"""
+        task = self.running.get(guild.id)
+        if task is None or task.done():
+            task = asyncio.create_task(self.backfill_guild(guild))
+            self.running[guild.id] = task
+        return task
+
+    def resume_incomplete(self, guilds):
+        """Resume backfills interrupted by a restart"""
+        for guild in guilds:
+            progress = self.database.get_backfill_progress(guild.id)
+            if progress and not progress['completed']:
+                self.schedule(guild)
+
+    async def backfill_guild(self, guild):
+        """Backfill every readable text channel in a guild"""
+        me = guild.me
+        channels = [
+            channel for channel in guild.text_channels
+            if me is None or channel.permissions_for(me).read_message_history
+        ]
+
+        # Live ingestion covers everything after this moment
+        self.database.start_backfill(guild.id, [channel.id for channel in channels], datetime.now(timezone.utc))
+        checkpoints = self.database.get_backfill_checkpoints(guild.id)
+
+        pending = [channel for channel in channels if not checkpoints[channel.id]['completed']]
+        print(f'⏪ Backfilling {len(pending)} channels in {guild.name} (ID: {guild.id})')
+
+        started = time.monotonic()
+        await asyncio.gather(*(
+            self.backfill_channel(guild, channel, checkpoints[channel.id]) for channel in pending
+        ))
+
+        progress = self.database.get_backfill_progress(guild.id)
+        print(f'✅ Backfill for guild {guild.id}: {progress["message_count"]:,} messages, '
+              f'{progress["channels_completed"]}/{progress["channels_total"]} channels '
+              f'in {time.monotonic() - started:.0f}s')
+
+    async def backfill_channel(self, guild, channel, checkpoint: Dict):
+        """Read one channel's history oldest-first from its checkpoint"""
+        async with self.semaphore:
+            if checkpoint['last_message_id']:
+                after = discord.Object(id=checkpoint['last_message_id'])
+            else:
+                after = datetime.now(timezone.utc) - timedelta(days=self.lookback_days)
+            before = datetime.strptime(checkpoint['until_timestamp'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+
+            batch = []
+            last_message_id: Optional[int] = None
+            seen = 0
+            try:
+                await self.limiter.acquire()
+                async for message in channel.history(limit=None, after=after, before=before, oldest_first=True):
+                    seen += 1
+                    if seen % HISTORY_PAGE_SIZE == 0:
+                        # The next iteration may fetch another page
+                        await self.limiter.acquire()
+
+                    last_message_id = message.id
+                    if message.author.bot:
+                        continue
+                    batch.append((guild.id, channel.id, message.author.id,
+                                  len(message.content), sql_timestamp(message.created_at)))
+
+                    if len(batch) >= self.batch_size:
+                        self._save(guild.id, channel.id, batch, last_message_id)
+                        batch = []
+
+                self._save(guild.id, channel.id, batch, last_message_id, completed=True)
+
+            except discord.Forbidden:
+                # Nothing more we can read here; don't retry on every restart
+                self._save(guild.id, channel.id, batch, last_message_id, completed=True)
+            except Exception as e:
+                # Keep what we have; the checkpoint lets the next run resume
+                self._save(guild.id, channel.id, batch, last_message_id)
+                print(f'Backfill error in channel {channel.id} of guild {guild.id}: {e}')
+
+    def _save(self, guild_id: int, channel_id: int, batch, last_message_id: Optional[int], completed: bool = False):
+        self.database.save_backfill_batch(guild_id, channel_id, batch, last_message_id, completed)
+        if self.on_batch is not None:
+            self.on_batch(guild_id)
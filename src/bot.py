@@ -4,28 +4,97 @@ Rations Discord Bot - Main Bot Implementation
 import asyncio
 import discord
 from discord.ext import commands, tasks
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import Config
+from src.anomaly import RatePolicy
+from src.backfill import Backfiller
+from src.collection import CollectionPolicy, store_snapshot
 from src.database import db
+from src.guild_state import GuildStateRegistry
+from src.ingestion import IngestionPolicy
+from src.ipc import change_publisher
+from src.replay import EventRecorder
+from src.summary_cache import SummaryCache
 
 # Bot intents - Start with minimal intents
 intents = discord.Intents.default()
 intents.guilds = True
 intents.voice_states = True
 # Note: message_content and members require privileged intents to be enabled in Discord Developer Portal
+intents.members = Config.TRACK_MEMBER_JOINS  # member joins feed the raid detector
+
+# Gateway events we never read
+intents.typing = False
+intents.reactions = False
+intents.emojis_and_stickers = False
+intents.integrations = False
+intents.webhooks = False
+intents.invites = False
+
+# Only members currently in voice are cached; we key everything else by id
+member_cache_flags = discord.MemberCacheFlags.none()
+member_cache_flags.voice = True
 
 class RationsBot(commands.Bot):
     def __init__(self):
         super().__init__(
             command_prefix=None,  # No text commands, only slash commands
             intents=intents,
-            help_command=None
+            help_command=None,
+            max_messages=Config.MAX_MESSAGE_HISTORY or None,  # 0 disables the message cache
+            member_cache_flags=member_cache_flags,
+            chunk_guilds_at_startup=False
+        )
+        # Voice sessions, rate detectors and other per-guild state
+        self.guild_states = GuildStateRegistry(
+            message_policy=RatePolicy(
+                bucket_seconds=Config.ANOMALY_BUCKET_SECONDS,
+                alpha=Config.ANOMALY_ALPHA,
+                threshold=Config.ANOMALY_THRESHOLD,
+                min_events=Config.ANOMALY_MIN_MESSAGES,
+                warmup=Config.ANOMALY_WARMUP_BUCKETS
+            ),
+            join_policy=RatePolicy(
+                bucket_seconds=Config.ANOMALY_BUCKET_SECONDS,
+                alpha=Config.ANOMALY_ALPHA,
+                threshold=Config.ANOMALY_THRESHOLD,
+                min_events=Config.ANOMALY_MIN_JOINS,
+                warmup=Config.ANOMALY_WARMUP_BUCKETS
+            ),
+            max_channels=Config.ANOMALY_MAX_CHANNELS,
+            collection_policy=CollectionPolicy(
+                base_interval=Config.ANALYTICS_UPDATE_INTERVAL,
+                min_interval=Config.ANALYTICS_MIN_INTERVAL,
+                max_interval=Config.ANALYTICS_MAX_INTERVAL,
+                busy_messages=Config.ANALYTICS_BUSY_MESSAGES
+            )
+        )
+        self.ingestion = IngestionPolicy(
+            max_per_minute=Config.INGEST_MAX_MESSAGES_PER_MINUTE,
+            fixed_rates=Config.INGEST_SAMPLE_RATES,
+            window_minutes=Config.INGEST_RATE_WINDOW_MINUTES
         )
-        self.voice_tracking = {}  # Track voice channel activity
+        self.last_memory_report = 0.0
+        self.summary_cache = SummaryCache(Config.SUMMARY_CACHE_SIZE)  # Backs /analytics
+        self.ready_event = None  # Set by start.py to hear when the bot is online
+        self.backfiller = Backfiller(
+            db,
+            lookback_days=Config.BACKFILL_LOOKBACK_DAYS,
+            concurrency=Config.BACKFILL_CONCURRENCY,
+            requests_per_second=Config.BACKFILL_REQUESTS_PER_SECOND,
+            batch_size=Config.BACKFILL_BATCH_SIZE,
+            on_batch=change_publisher.mark_dirty
+        )
+        # Optional gateway event log for offline replay
+        self.recorder = EventRecorder(Config.EVENT_RECORD_PATH) if Config.EVENT_RECORD_PATH else None
+    
+    def now(self):
+        """Current UTC time; the replay engine swaps in the recorded event time"""
+        return datetime.now(timezone.utc)
         
     async def on_ready(self):
         """Called when bot is ready"""
@@ -33,7 +102,12 @@ class RationsBot(commands.Bot):
         print(f'📊 Connected to {len(self.guilds)} guilds')
         
         # Start background tasks
-        self.analytics_update_task.start()
+        change_publisher.start()
+        if not self.analytics_update_task.is_running():
+            self.analytics_update_task.start()
+        if not self.maintenance_task.is_running():
+            self.maintenance_task.start()
+        self.backfiller.resume_incomplete(self.guilds)
         
         # Sync slash commands
         try:
@@ -47,17 +121,31 @@ class RationsBot(commands.Bot):
             type=discord.ActivityType.watching,
             name=f"{len(self.guilds)} servers | /analytics"
         ))
+        
+        # Readiness handshake with the combined launcher
+        if self.ready_event is not None:
+            self.ready_event.set()
     
     async def on_guild_join(self, guild):
         """Called when bot joins a new guild"""
         print(f'📈 Joined new guild: {guild.name} (ID: {guild.id})')
+        self.backfiller.schedule(guild)
         await self.update_presence()
     
     async def on_guild_remove(self, guild):
         """Called when bot leaves a guild"""
         print(f'📉 Left guild: {guild.name} (ID: {guild.id})')
+        self.summary_cache.discard(guild.id)
+        self.guild_states.discard(guild.id)
         await self.update_presence()
     
+    async def close(self):
+        """Remove the change notification socket on shutdown"""
+        change_publisher.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        await super().close()
+    
     async def update_presence(self):
         """Update bot presence with current guild count"""
         await self.change_presence(activity=discord.Activity(
@@ -72,15 +160,63 @@ class RationsBot(commands.Bot):
         
         # Log message activity
         if message.guild:
-            db.log_message_activity(
-                guild_id=message.guild.id,
-                channel_id=message.channel.id,
-                user_id=message.author.id,
-                message_length=len(message.content)
+            if self.recorder is not None:
+                self.recorder.record_message(message)
+            
+            # Every message feeds the counters and detectors; very busy guilds only store a weighted sample
+            sent_at = message.created_at.timestamp()
+            anomalies = self.guild_states.observe_message(message.guild.id, message.channel.id, sent_at)
+            
+            weight = self.ingestion.weight(
+                message.guild.id,
+                self.guild_states.get(message.guild.id).messages_per_minute(sent_at, self.ingestion.window_minutes)
             )
+            if weight is not None:
+                db.log_message_activity(
+                    guild_id=message.guild.id,
+                    channel_id=message.channel.id,
+                    user_id=message.author.id,
+                    message_length=len(message.content),
+                    timestamp=message.created_at,
+                    weight=weight
+                )
+                change_publisher.mark_dirty(message.guild.id)
+            
+            for anomaly in anomalies:
+                self.record_anomaly(message.guild.id, anomaly, message.created_at)
         
         await self.process_commands(message)
     
+    async def on_member_join(self, member):
+        """Watch join rates for raids (needs TRACK_MEMBER_JOINS)"""
+        if member.bot:
+            return
+        
+        now = self.now()
+        if self.recorder is not None:
+            self.recorder.record_member_join(member, now)
+        
+        anomaly = self.guild_states.observe_join(member.guild.id, now.timestamp())
+        if anomaly is not None:
+            self.record_anomaly(member.guild.id, anomaly, now)
+    
+    def record_anomaly(self, guild_id, anomaly, when):
+        """Store a detector alert and let the dashboard know"""
+        where = f"channel {anomaly['channel_id']}" if anomaly['channel_id'] else 'guild-wide'
+        print(f"🚨 Anomaly in guild {guild_id} ({where}): {anomaly['observed']} {anomaly['kind']} "
+              f"in {Config.ANOMALY_BUCKET_SECONDS}s vs ~{anomaly['expected']:.1f} expected")
+        db.log_anomaly_event(
+            guild_id=guild_id,
+            channel_id=anomaly['channel_id'],
+            kind=anomaly['kind'],
+            observed=anomaly['observed'],
+            expected=anomaly['expected'],
+            score=anomaly['score'],
+            bucket_seconds=Config.ANOMALY_BUCKET_SECONDS,
+            timestamp=when
+        )
+        change_publisher.mark_dirty(guild_id)
+    
     async def on_voice_state_update(self, member, before, after):
         """Track voice channel activity"""
         if member.bot:
@@ -88,71 +224,104 @@ class RationsBot(commands.Bot):
         
         guild_id = member.guild.id
         user_id = member.id
+        now = self.now()
+        voice_sessions = self.guild_states.get(guild_id).voice_sessions
+        
+        if self.recorder is not None:
+            self.recorder.record_voice_state(member, before, after, now)
         
         # User joined a voice channel
         if before.channel is None and after.channel is not None:
-            self.voice_tracking[user_id] = datetime.now()
+            voice_sessions[user_id] = now.timestamp()
             db.log_user_activity(
                 guild_id=guild_id,
                 user_id=user_id,
                 activity_type='voice_join',
-                channel_id=after.channel.id
+                channel_id=after.channel.id,
+                timestamp=now
             )
+            change_publisher.mark_dirty(guild_id)
         
         # User left a voice channel
         elif before.channel is not None and after.channel is None:
-            if user_id in self.voice_tracking:
-                duration = (datetime.now() - self.voice_tracking[user_id]).total_seconds()
+            if user_id in voice_sessions:
+                duration = now.timestamp() - voice_sessions.pop(user_id)
                 db.log_user_activity(
                     guild_id=guild_id,
                     user_id=user_id,
                     activity_type='voice_leave',
                     channel_id=before.channel.id,
-                    duration=int(duration)
+                    duration=int(duration),
+                    timestamp=now
                 )
-                del self.voice_tracking[user_id]
+                change_publisher.mark_dirty(guild_id)
     
-    @tasks.loop(seconds=Config.ANALYTICS_UPDATE_INTERVAL)
+    @tasks.loop(seconds=Config.ANALYTICS_MIN_INTERVAL)
     async def analytics_update_task(self):
-        """Update analytics data periodically"""
+        """Snapshot every guild whose collection is due; busy guilds come up often, quiet ones back off"""
+        now = self.now().timestamp()
         for guild in self.guilds:
+            schedule = self.guild_states.collection(guild.id)
+            if not schedule.due(now):
+                continue
             try:
+                state = self.guild_states.get(guild.id)
+                
                 # Count text channels
                 text_channels = len([c for c in guild.channels if isinstance(c, discord.TextChannel)])
                 
-                # Estimate recent message count (this is simplified)
-                message_count = 0
-                for channel in guild.text_channels:
-                    try:
-                        # Count messages from last hour as an estimate
-                        async for message in channel.history(limit=100, after=datetime.now() - timedelta(hours=1)):
-                            if not message.author.bot:
-                                message_count += 1
-                    except discord.Forbidden:
-                        continue
+                # Messages in the last hour, counted as they arrived in on_message
+                message_count = state.messages_last_hour(now)
                 
-                # Calculate voice minutes
-                voice_minutes = sum([
-                    (datetime.now() - start_time).total_seconds() / 60
-                    for start_time in self.voice_tracking.values()
-                ])
+                # Calculate voice minutes for members currently in this guild's voice channels
+                voice_minutes = state.voice_minutes(now)
                 
                 # Store analytics
-                db.log_server_analytics(
-                    guild_id=guild.id,
-                    member_count=guild.member_count or 0,
-                    channel_count=text_channels,
-                    message_count=message_count,
-                    voice_minutes=int(voice_minutes)
-                )
+                stored = store_snapshot(db, guild.id, schedule, now, (
+                    guild.member_count or 0, text_channels, message_count, int(voice_minutes)
+                ))
+                change_publisher.mark_dirty(guild.id)
+                
+                # Precompute the /analytics summary while we're here, but only when it has a new point to show
+                if stored:
+                    summary = await asyncio.to_thread(db.get_server_summary, guild.id, 7)
+                    if summary:
+                        summary['computed_at'] = datetime.now()
+                    self.summary_cache.put(guild.id, summary)
                 
             except Exception as e:
                 print(f'Error updating analytics for guild {guild.id}: {e}')
+        
+        # Let the web dashboard know this collection tick is done
+        change_publisher.flush()
+        
+        if now - self.last_memory_report < Config.ANALYTICS_UPDATE_INTERVAL:
+            return
+        self.last_memory_report = now
+        report = self.guild_states.memory_report(len(self.guilds))
+        print(f"🧠 Memory: RSS {report['rss_bytes'] / 2**20:.1f} MB across {report['guilds']} guilds "
+              f"(~{report['rss_per_guild_bytes'] / 1024:.1f} KB/guild, "
+              f"tracked state ~{report['state_per_guild_bytes']} B/guild)")
     
     @analytics_update_task.before_loop
     async def before_analytics_update_task(self):
         """Wait for bot to be ready"""
         await self.wait_until_ready()
+    
+    @tasks.loop(hours=24)
+    async def maintenance_task(self):
+        """Move data past retention into the cold archive, once a day"""
+        try:
+            # Archiving reads and rewrites files, so keep it off the event loop
+            archived = await asyncio.to_thread(db.cleanup_old_data, Config.DATA_RETENTION_DAYS)
+            print(f'🧊 Retention: archived {archived:,} rows older than {Config.DATA_RETENTION_DAYS} days')
+        except Exception as e:
+            print(f'Error during data maintenance: {e}')
+    
+    @maintenance_task.before_loop
+    async def before_maintenance_task(self):
+        """Wait for bot to be ready"""
+        await self.wait_until_ready()
 
 # Bot instance
 bot = RationsBot()
@@ -166,18 +335,22 @@ async def analytics_slash(interaction: discord.Interaction):
         return
     
     try:
-        # Defer response for longer processing
-        await interaction.response.defer()
-        # Get analytics data
-        analytics = db.get_server_analytics(interaction.guild.id, days=7)
-        message_analytics = db.get_message_analytics(interaction.guild.id, days=7)
+        # Served from the summary precomputed by the collection tick
+        summary = bot.summary_cache.get(interaction.guild.id)
+        if summary is None:
+            # Evicted from (or not yet in) the cache: compute it off the event loop and keep it
+            await interaction.response.defer()
+            summary = await asyncio.to_thread(db.get_server_summary, interaction.guild.id, 7)
+            if summary:
+                summary['computed_at'] = datetime.now()
+            bot.summary_cache.put(interaction.guild.id, summary)
         
-        if not analytics:
-            await interaction.followup.send("📊 No analytics data available yet. Please wait for data to be collected.")
-            return
+        # Deferred interactions are answered with a followup
+        respond = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
         
-        # Get latest data
-        latest = analytics[0]
+        if not summary:
+            await respond("📊 No analytics data available yet. Please wait for data to be collected.")
+            return
         
         # Create embed
         embed = discord.Embed(
@@ -188,37 +361,37 @@ async def analytics_slash(interaction: discord.Interaction):
         
         embed.add_field(
             name="📈 Members",
-            value=f"{latest['member_count']:,}",
+            value=f"{summary['member_count']:,}",
             inline=True
         )
         
         embed.add_field(
             name="📝 Channels",
-            value=f"{latest['channel_count']:,}",
+            value=f"{summary['channel_count']:,}",
             inline=True
         )
         
         embed.add_field(
             name="💬 Messages",
-            value=f"{sum([a['message_count'] for a in analytics]):,}",
+            value=f"{summary['message_count']:,}",
             inline=True
         )
         
         embed.add_field(
             name="🎙️ Voice Minutes",
-            value=f"{sum([a['voice_minutes'] for a in analytics]):,}",
+            value=f"{summary['voice_minutes']:,}",
             inline=True
         )
         
         embed.add_field(
             name="📅 Data Points",
-            value=f"{len(analytics)}",
+            value=f"{summary['data_points']}",
             inline=True
         )
         
         # Most active channel
-        if message_analytics:
-            top_channel = message_analytics[0]
+        top_channel = summary['top_channel']
+        if top_channel:
             channel = interaction.guild.get_channel(top_channel['channel_id'])
             channel_name = channel.name if channel else "Unknown"
             embed.add_field(
@@ -228,13 +401,16 @@ async def analytics_slash(interaction: discord.Interaction):
             )
         
         embed.set_footer(text="Use /help for more commands")
-        embed.timestamp = datetime.now()
+        embed.timestamp = summary['computed_at']
         
-        await interaction.followup.send(embed=embed)
+        await respond(embed=embed)
         
     except Exception as e:
         print(f'Analytics command error: {e}')
-        await interaction.followup.send("❌ An error occurred while fetching analytics data.")
+        if not interaction.response.is_done():
+            await interaction.response.send_message("❌ An error occurred while fetching analytics data.")
+        else:
+            await interaction.followup.send("❌ An error occurred while fetching analytics data.")
 
 @bot.tree.command(name='help', description='Show help information about the bot')
 async def help_slash(interaction: discord.Interaction):
@@ -303,12 +479,14 @@ async def invite_slash(interaction: discord.Interaction):
     
     await interaction.response.send_message(embed=embed)
 
-async def main():
+async def main(ready_event=None):
     """Main bot function"""
     if not Config.DISCORD_TOKEN:
         print("❌ Error: DISCORD_TOKEN not found!")
         return
     
+    bot.ready_event = ready_event
+    
     try:
         async with bot:
             await bot.start(Config.DISCORD_TOKEN)
@@ -0,0 +1,167 @@
+"""
+Adaptive snapshot collection for Rations Discord Analytics Bot
+
+Each guild is sampled on its own schedule: busy guilds every
+`min_interval`, quiet ones backing off towards `max_interval`. Whatever the
+cadence, stored points stay on a `base_interval` grid, so the series has
+the same density as fixed-interval collection. Samples that match the
+previous one don't add a server_analytics row; they lengthen the open row's
+run-length span instead (`span_count` points, `sample_interval` seconds
+apart), which the query methods expand back into a time series.
+"""
+from array import array
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+# Longest stretch one server_analytics row may cover; window queries look back this far for spans reaching into them
+MAX_SPAN_SECONDS = 86400
+
+
+class MinuteCounter:
+    """Messages in the trailing hour, as 60 per-minute buckets"""
+
+    __slots__ = ('counts', 'minute')
+
+    def __init__(self):
+        self.counts = array('I', bytes(4 * 60))
+        self.minute = 0  # newest bucket, in unix minutes
+
+    def add(self, timestamp: float, count: int = 1):
+        minute = int(timestamp // 60)
+        if minute > self.minute:
+            self._advance(minute)
+        elif minute <= self.minute - 60:
+            return  # older than the window
+        self.counts[minute % 60] += count
+
+    def total(self, now: float) -> int:
+        minute = int(now // 60)
+        if minute > self.minute:
+            self._advance(minute)
+        return sum(self.counts)
+
+    def rate(self, now: float, minutes: int) -> float:
+        """Messages per minute over the last `minutes`, counted from the first of them that had any.
+
+        The current minute counts for what has passed of it (at least 10
+        seconds), so a window that only just started filling isn't diluted.
+        """
+        minute = int(now // 60)
+        if minute > self.minute:
+            self._advance(minute)
+        counts = [self.counts[m % 60] for m in range(minute - min(minutes, 60) + 1, minute + 1)]
+        total = sum(counts)
+        if not total:
+            return 0.0
+        quiet = next(index for index, count in enumerate(counts) if count)
+        return total / (len(counts) - 1 - quiet + max((now % 60) / 60, 1 / 6))
+
+    def _advance(self, minute: int):
+        # Clear the buckets of minutes that passed without messages
+        for stale in range(max(self.minute + 1, minute - 59), minute + 1):
+            self.counts[stale % 60] = 0
+        self.minute = minute
+
+
+class CollectionPolicy:
+    """Sampling intervals shared by every guild's SnapshotSchedule"""
+
+    def __init__(self, base_interval: int = 300, min_interval: int = 60, max_interval: int = 1800,
+                 busy_messages: int = 300):
+        self.base_interval = base_interval  # after a change, and the spacing of span points
+        self.min_interval = min_interval  # guilds with at least `busy_messages` in the last hour
+        self.max_interval = max_interval  # ceiling for guilds that keep reporting the same snapshot
+        self.busy_messages = busy_messages
+
+
+class SnapshotSchedule:
+    """When a guild is next sampled, and the server_analytics span its unchanged samples extend"""
+
+    __slots__ = ('policy', 'interval', 'next_due', 'values', 'span_id', 'span_start', 'span_count')
+
+    def __init__(self, policy: CollectionPolicy):
+        self.policy = policy
+        self.interval = policy.base_interval
+        self.next_due = 0.0
+        self.values: Optional[Tuple] = None  # last sampled snapshot
+        self.span_id: Optional[int] = None  # server_analytics row holding it
+        self.span_start = 0
+        self.span_count = 0
+
+    def due(self, now: float) -> bool:
+        return now >= self.next_due
+
+    def wake(self, now: float):
+        """Activity in a backed-off guild: sample it again within the base interval"""
+        if self.interval > self.policy.base_interval:
+            self.next_due = min(self.next_due, now + self.policy.base_interval)
+
+    def observe(self, now: float, values: Tuple, messages: int) -> Tuple[int, Optional[int]]:
+        """Schedule the next sample and decide how to store this one.
+
+        Returns the length the open span should now have, and the grid point
+        a new row starts at (None to keep the open row). Samples taken before
+        the span's next grid point store nothing; a change seen then is
+        stored from the next grid point. A changed snapshot fills the open
+        span up to its grid point: the old values are known to hold until
+        they were seen to change.
+        """
+        policy = self.policy
+        changed = values != self.values
+        if messages >= policy.busy_messages:
+            self.interval = policy.min_interval
+        elif changed:
+            self.interval = policy.base_interval
+        else:
+            self.interval = min(self.interval * 2, policy.max_interval)
+        self.next_due = now + self.interval
+
+        if self.span_id is None:
+            return 0, int(now)
+
+        # Latest grid point at or before now, counted from the span's start
+        step = policy.base_interval
+        reached = int((now - self.span_start) // step)
+        if reached < self.span_count:
+            return self.span_count, None
+        limit = 1 + MAX_SPAN_SECONDS // step
+        if not changed and reached < limit:
+            return reached + 1, None
+        return min(reached, limit), self.span_start + reached * step
+
+    def start_span(self, row_id: int, start: int, values: Tuple):
+        self.values = values
+        self.span_id = row_id
+        self.span_start = start
+        self.span_count = 1
+
+
+def store_snapshot(database, guild_id: int, schedule: SnapshotSchedule, now: float, values: Tuple) -> bool:
+    """Write one sampled (member_count, channel_count, message_count, voice_minutes) snapshot.
+
+    Returns whether a server_analytics row was written or extended.
+    """
+    span_count, row_start = schedule.observe(now, values, messages=values[2])
+    extended = False
+    if span_count > schedule.span_count:
+        if database.extend_server_span(schedule.span_id, span_count):
+            schedule.span_count = span_count
+            extended = True
+        elif row_start is None:
+            # The span's row was archived in the meantime; the point it would have gained opens a new one
+            row_start = schedule.span_start + (span_count - 1) * schedule.policy.base_interval
+    if row_start is None:
+        return extended
+
+    member_count, channel_count, message_count, voice_minutes = values
+    row_id = database.log_server_analytics(
+        guild_id=guild_id,
+        member_count=member_count,
+        channel_count=channel_count,
+        message_count=message_count,
+        voice_minutes=voice_minutes,
+        timestamp=datetime.fromtimestamp(row_start, timezone.utc),
+        sample_interval=schedule.policy.base_interval
+    )
+    schedule.start_span(row_id, row_start, values)
+    return True
@@ -1,26 +1,165 @@
 """
 Database operations for Rations Discord Analytics Bot
 """
+import calendar
 import sqlite3
 import os
 import json
-from datetime import datetime, timedelta
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Tuple
 import threading
+from urllib.request import pathname2url
+
+from config import Config
+from src.collection import MAX_SPAN_SECONDS
+from src.ingestion import standard_error
+from src.histogram import LengthHistogram, bucket_for_length, DEFAULT_PERCENTILES
+
+# A server_analytics row stands for span_count identical snapshots taken sample_interval seconds apart
+SPAN_START = "CAST(strftime('%s', timestamp) AS INTEGER)"
+SPAN_END = f"{SPAN_START} + (span_count - 1) * sample_interval"
+# Rows with a point at or after a window start: (looked-back start, unix start) parameters
+SPAN_WINDOW = f"timestamp >= ? AND {SPAN_END} >= ?"
+# Rows whose last point is before a timestamp, i.e. that retention may move: one parameter
+SPAN_BEFORE = f"{SPAN_END} < CAST(strftime('%s', ?) AS INTEGER)"
+# Points of a row at or after a unix window start: one parameter
+SPAN_POINTS = f"span_count - MAX(0, MIN(span_count, (? - {SPAN_START} + sample_interval - 1) / sample_interval))"
+SNAPSHOT_COLUMNS = f"id, guild_id, member_count, channel_count, message_count, voice_minutes, timestamp, " \
+                   f"span_count, sample_interval, {SPAN_START} AS start"
+
+# SQLite VM instructions between time budget checks (well under a millisecond)
+BUDGET_CHECK_INTERVAL = 10000
+
+
+class QueryTimeout(Exception):
+    """Reads ran past their time budget and were interrupted"""
+    
+    def __init__(self, budget: float):
+        super().__init__(f'query exceeded its {budget:g}s budget')
+        self.budget = budget
+
+
+def sql_timestamp(value: datetime) -> str:
+    """Format a datetime like SQLite's CURRENT_TIMESTAMP (naive UTC)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime('%Y-%m-%d %H:%M:%S')
+
+def sql_timestamp_from_epoch(seconds: int) -> str:
+    """Format unix seconds like sql_timestamp"""
+    return sql_timestamp(datetime.fromtimestamp(int(seconds), timezone.utc))
+
+def span_window(since: datetime) -> Tuple[datetime, int]:
+    """SPAN_WINDOW parameters for a window starting at `since`"""
+    return since - timedelta(seconds=MAX_SPAN_SECONDS), calendar.timegm(since.timetuple())
+
+def expand_snapshot_span(row: Dict, first: int = 0, since: Optional[int] = None) -> List[Dict]:
+    """Snapshots of one span row, oldest first, from point `first` and unix time `since` on"""
+    interval = row['sample_interval']
+    if since is not None and since > row['start']:
+        first = max(first, -(-(since - row['start']) // interval))
+    
+    points = []
+    for k in range(first, row['span_count']):
+        points.append({
+            'id': row['id'],
+            'guild_id': row['guild_id'],
+            'member_count': row['member_count'],
+            'channel_count': row['channel_count'],
+            'message_count': row['message_count'],
+            'voice_minutes': row['voice_minutes'],
+            'timestamp': row['timestamp'] if k == 0 else sql_timestamp_from_epoch(row['start'] + k * interval)
+        })
+    return points
+
+def split_voice_session(left_at: datetime, duration: int) -> List[Tuple[str, float]]:
+    """Split a voice session ending at `left_at` into (hour, minutes) pieces"""
+    if duration <= 0:
+        return []
+    
+    end = datetime.strptime(sql_timestamp(left_at), '%Y-%m-%d %H:%M:%S')
+    start = end - timedelta(seconds=duration)
+    
+    pieces = []
+    hour = start.replace(minute=0, second=0)
+    while hour < end:
+        next_hour = hour + timedelta(hours=1)
+        overlap = min(end, next_hour) - max(start, hour)
+        pieces.append((hour.strftime('%Y-%m-%d %H:00:00'), overlap.total_seconds() / 60))
+        hour = next_hour
+    return pieces
 
 class Database:
-    def __init__(self, db_path: str = 'rations.db'):
+    def __init__(self, db_path: str = 'rations.db', read_only: bool = False, archive_dir: Optional[str] = None,
+                 retention_days: int = 30):
+        # Nothing is opened here; connections and tables are created on first use
         self.db_path = db_path
+        self.read_only = read_only  # Report workers only read, and never create tables
+        self.archive_dir = archive_dir  # Rows past retention move here instead of being deleted
+        self.retention_days = retention_days
+        self.archive = None
         self.local = threading.local()
-        self.init_database()
+        self.pid = os.getpid()
+        self.initialized = False
+        self.init_lock = threading.Lock()
     
     def get_connection(self):
         """Get thread-local database connection"""
+        if self.pid != os.getpid():
+            # Forked worker: never reuse SQLite handles inherited from the parent
+            self.local = threading.local()
+            self.pid = os.getpid()
+        
         if not hasattr(self.local, 'connection'):
-            self.local.connection = sqlite3.connect(self.db_path)
-            self.local.connection.row_factory = sqlite3.Row
+            if self.read_only:
+                uri = f'file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro'
+                self.local.connection = sqlite3.connect(uri, uri=True)
+                self.local.connection.row_factory = sqlite3.Row
+            else:
+                self.local.connection = sqlite3.connect(self.db_path)
+                self.local.connection.row_factory = sqlite3.Row
+                self.ensure_initialized()
         return self.local.connection
     
+    @contextmanager
+    def time_budget(self, seconds: float):
+        """Interrupt this thread's reads once `seconds` have passed, raising QueryTimeout.
+        
+        SQLite checks the deadline from its progress handler, so a long scan
+        stops mid-statement and releases its read lock; archive reads check
+        it before and after decoding.
+        """
+        conn = self.get_connection()
+        deadline = time.monotonic() + seconds
+        self.local.budget = (deadline, seconds)
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, BUDGET_CHECK_INTERVAL)
+        try:
+            yield
+        except sqlite3.OperationalError as e:
+            if str(e) == 'interrupted' and time.monotonic() > deadline:
+                raise QueryTimeout(seconds) from e
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+            self.local.budget = None
+    
+    def check_budget(self):
+        """Raise QueryTimeout if this thread's time budget has run out"""
+        budget = getattr(self.local, 'budget', None)
+        if budget is not None and time.monotonic() > budget[0]:
+            raise QueryTimeout(budget[1])
+    
+    def ensure_initialized(self):
+        """Create tables once per process, on the first connection"""
+        if self.initialized:
+            return
+        with self.init_lock:
+            if not self.initialized:
+                self.init_database()
+                self.initialized = True
+    
     def init_database(self):
         """Initialize database tables"""
         conn = self.get_connection()
@@ -35,9 +174,16 @@ class Database:
             channel_count INTEGER DEFAULT 0,
             message_count INTEGER DEFAULT 0,
             voice_minutes INTEGER DEFAULT 0,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            span_count INTEGER DEFAULT 1,
+            sample_interval INTEGER DEFAULT 300
         )
         ''')
+        # Databases from before run-length spans: every existing row is a single snapshot
+        server_columns = {row[1] for row in cursor.execute('PRAGMA table_info(server_analytics)').fetchall()}
+        if 'span_count' not in server_columns:
+            cursor.execute('ALTER TABLE server_analytics ADD COLUMN span_count INTEGER DEFAULT 1')
+            cursor.execute('ALTER TABLE server_analytics ADD COLUMN sample_interval INTEGER DEFAULT 300')
         
         # Message analytics table
         cursor.execute('''
@@ -47,7 +193,24 @@ class Database:
             channel_id INTEGER NOT NULL,
             user_id INTEGER NOT NULL,
             message_length INTEGER DEFAULT 0,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            weight REAL DEFAULT 1
+        )
+        ''')
+        # Databases from before sampled ingestion: every existing row is one message
+        message_columns = {row[1] for row in cursor.execute('PRAGMA table_info(message_analytics)').fetchall()}
+        if 'weight' not in message_columns:
+            cursor.execute('ALTER TABLE message_analytics ADD COLUMN weight REAL DEFAULT 1')
+        
+        # Message length histograms, one row per (guild, channel, hour, bucket)
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS message_length_histograms (
+            guild_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            hour DATETIME NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER DEFAULT 0,
+            PRIMARY KEY (guild_id, channel_id, hour, bucket)
         )
         ''')
         
@@ -64,6 +227,81 @@ class Database:
         )
         ''')
         
+        # Voice minutes per (guild, hour), with sessions split across the hours they cover
+        voice_rollup_exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'voice_minutes_hourly'"
+        ).fetchone()
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS voice_minutes_hourly (
+            guild_id INTEGER NOT NULL,
+            hour DATETIME NOT NULL,
+            minutes REAL DEFAULT 0,
+            PRIMARY KEY (guild_id, hour)
+        )
+        ''')
+        if not voice_rollup_exists:
+            # Databases from before the rollup: build it from recorded sessions
+            cursor.execute('''
+            SELECT guild_id, timestamp, duration FROM user_activity
+            WHERE activity_type = 'voice_leave' AND duration > 0
+            ''')
+            for guild_id, left_at, duration in cursor.fetchall():
+                self._add_voice_minutes(
+                    cursor, guild_id, datetime.strptime(left_at, '%Y-%m-%d %H:%M:%S'), duration
+                )
+        
+        # Rate anomalies flagged by the bot's streaming detectors
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS anomaly_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            channel_id INTEGER,
+            kind TEXT NOT NULL,
+            observed INTEGER NOT NULL,
+            expected REAL NOT NULL,
+            score REAL,
+            bucket_seconds INTEGER NOT NULL,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_anomaly_events_guild_time
+        ON anomaly_events (guild_id, timestamp)
+        ''')
+        
+        # Per-channel progress of historical backfills
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+            guild_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            last_message_id INTEGER,
+            until_timestamp DATETIME NOT NULL,
+            message_count INTEGER DEFAULT 0,
+            completed INTEGER DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (guild_id, channel_id)
+        )
+        ''')
+        
+        # Per-guild window scans (dashboard queries and batch reports)
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_message_analytics_guild_time
+        ON message_analytics (guild_id, timestamp)
+        ''')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_server_analytics_guild_time
+        ON server_analytics (guild_id, timestamp)
+        ''')
+        
+        # Covering index for per-guild hourly and per-channel totals, so they never touch the base table
+        index_columns = [row[2] for row in cursor.execute('PRAGMA index_info(idx_histograms_guild_hour)').fetchall()]
+        if index_columns and 'channel_id' not in index_columns:
+            cursor.execute('DROP INDEX idx_histograms_guild_hour')
+        cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_histograms_guild_hour
+        ON message_length_histograms (guild_id, hour, channel_id, count)
+        ''')
+        
         # Discord OAuth sessions
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS oauth_sessions (
@@ -78,75 +316,482 @@ class Database:
         
         conn.commit()
     
-    def log_server_analytics(self, guild_id: int, member_count: int, channel_count: int, message_count: int, voice_minutes: int = 0):
-        """Log server analytics data"""
+    def log_server_analytics(self, guild_id: int, member_count: int, channel_count: int, message_count: int, voice_minutes: int = 0,
+                             timestamp: Optional[datetime] = None, sample_interval: int = Config.ANALYTICS_UPDATE_INTERVAL) -> int:
+        """Log a server snapshot, opening a span that later unchanged snapshots extend; returns its row id"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute('''
-        INSERT INTO server_analytics (guild_id, member_count, channel_count, message_count, voice_minutes)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (guild_id, member_count, channel_count, message_count, voice_minutes))
+        INSERT INTO server_analytics (guild_id, member_count, channel_count, message_count, voice_minutes, timestamp,
+                                      sample_interval)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (guild_id, member_count, channel_count, message_count, voice_minutes,
+              sql_timestamp(timestamp or datetime.now(timezone.utc)), sample_interval))
+        
+        conn.commit()
+        return cursor.lastrowid
+    
+    def extend_server_span(self, row_id: int, span_count: int) -> bool:
+        """Grow a snapshot span to `span_count` points; False if the row has since been archived"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('UPDATE server_analytics SET span_count = ? WHERE id = ?', (span_count, row_id))
         
         conn.commit()
+        return cursor.rowcount > 0
     
-    def log_message_activity(self, guild_id: int, channel_id: int, user_id: int, message_length: int):
-        """Log message activity"""
+    def log_message_activity(self, guild_id: int, channel_id: int, user_id: int, message_length: int,
+                             timestamp: Optional[datetime] = None, weight: float = 1.0):
+        """Log message activity (at `timestamp` if given, e.g. the message's creation time).
+        
+        A sampled message stands for `weight` messages (1 / its sampling rate),
+        both in its own row and in the hourly histogram.
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
+        timestamp = sql_timestamp(timestamp or datetime.now(timezone.utc))
+        
         cursor.execute('''
-        INSERT INTO message_analytics (guild_id, channel_id, user_id, message_length)
-        VALUES (?, ?, ?, ?)
-        ''', (guild_id, channel_id, user_id, message_length))
+        INSERT INTO message_analytics (guild_id, channel_id, user_id, message_length, timestamp, weight)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', (guild_id, channel_id, user_id, message_length, timestamp, weight))
+        
+        cursor.execute('''
+        INSERT INTO message_length_histograms (guild_id, channel_id, hour, bucket, count)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (guild_id, channel_id, hour, bucket) DO UPDATE SET count = count + excluded.count
+        ''', (guild_id, channel_id, timestamp[:13] + ':00:00', bucket_for_length(message_length), weight))
+        
+        conn.commit()
+    
+    def log_message_batch(self, rows: List[Tuple[int, int, int, int, str]]):
+        """Log many (guild_id, channel_id, user_id, message_length, timestamp) rows at once"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        self._insert_message_rows(cursor, rows)
         
         conn.commit()
     
-    def log_user_activity(self, guild_id: int, user_id: int, activity_type: str, channel_id: Optional[int] = None, duration: int = 0):
+    def _insert_message_rows(self, cursor, rows: List[Tuple[int, int, int, int, str]]):
+        """Bulk insert message rows and fold them into the hourly histograms"""
+        cursor.executemany('''
+        INSERT INTO message_analytics (guild_id, channel_id, user_id, message_length, timestamp)
+        VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+        
+        buckets: Dict[Tuple[int, int, str, int], int] = {}
+        for guild_id, channel_id, _, message_length, timestamp in rows:
+            key = (guild_id, channel_id, timestamp[:13] + ':00:00', bucket_for_length(message_length))
+            buckets[key] = buckets.get(key, 0) + 1
+        
+        cursor.executemany('''
+        INSERT INTO message_length_histograms (guild_id, channel_id, hour, bucket, count)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (guild_id, channel_id, hour, bucket) DO UPDATE SET count = count + excluded.count
+        ''', [key + (count,) for key, count in buckets.items()])
+    
+    def log_user_activity(self, guild_id: int, user_id: int, activity_type: str, channel_id: Optional[int] = None, duration: int = 0,
+                          timestamp: Optional[datetime] = None):
         """Log user activity"""
         conn = self.get_connection()
         cursor = conn.cursor()
+        timestamp = timestamp or datetime.now(timezone.utc)
         
         cursor.execute('''
-        INSERT INTO user_activity (guild_id, user_id, activity_type, channel_id, duration)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (guild_id, user_id, activity_type, channel_id, duration))
+        INSERT INTO user_activity (guild_id, user_id, activity_type, channel_id, duration, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', (guild_id, user_id, activity_type, channel_id, duration, sql_timestamp(timestamp)))
+        
+        if activity_type == 'voice_leave':
+            self._add_voice_minutes(cursor, guild_id, timestamp, duration)
         
         conn.commit()
     
+    def _add_voice_minutes(self, cursor, guild_id: int, left_at: datetime, duration: int):
+        """Add a finished voice session to the hourly voice rollup"""
+        cursor.executemany('''
+        INSERT INTO voice_minutes_hourly (guild_id, hour, minutes)
+        VALUES (?, ?, ?)
+        ON CONFLICT (guild_id, hour) DO UPDATE SET minutes = minutes + excluded.minutes
+        ''', [(guild_id, hour, minutes) for hour, minutes in split_voice_session(left_at, duration)])
+    
     def get_server_analytics(self, guild_id: int, days: int = 7) -> List[Dict]:
         """Get server analytics for the last N days"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
         since_date = datetime.now() - timedelta(days=days)
+        window = span_window(since_date)
         
-        cursor.execute('''
-        SELECT * FROM server_analytics 
-        WHERE guild_id = ? AND timestamp >= ?
+        cursor.execute(f'''
+        SELECT {SNAPSHOT_COLUMNS} FROM server_analytics
+        WHERE guild_id = ? AND {SPAN_WINDOW}
         ORDER BY timestamp DESC
-        ''', (guild_id, since_date))
+        ''', (guild_id, *window))
         
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        # Spans expand back into one snapshot per sample_interval
+        rows = []
+        for row in cursor.fetchall():
+            rows.extend(reversed(expand_snapshot_span(row, since=window[1])))
+        
+        archived = self._archived(guild_id, 'server_analytics', days, since_date,
+                                  ['member_count', 'channel_count', 'message_count', 'voice_minutes'])
+        if archived is not None:
+            # Archived snapshots are all older than the live ones
+            order = archived['timestamp'].argsort()[::-1]
+            columns = {name: values[order].tolist() for name, values in archived.items()}
+            for i, start in enumerate(columns['timestamp']):
+                span = {name: columns[name][i] for name in
+                        ('member_count', 'channel_count', 'message_count', 'voice_minutes', 'span_count', 'sample_interval')}
+                span.update(id=None, guild_id=guild_id, start=start, timestamp=sql_timestamp_from_epoch(start))
+                rows.extend(reversed(expand_snapshot_span(span, since=window[1])))
+        
+        return rows
     
-    def get_message_analytics(self, guild_id: int, days: int = 7) -> List[Dict]:
-        """Get message analytics for the last N days"""
+    def get_message_analytics(self, guild_id: int, days: int = 7, max_id: Optional[int] = None) -> List[Dict]:
+        """Get message analytics for the last N days (up to row `max_id`, e.g. a live cursor, if given).
+        
+        Counts are weighted sums, so sampled guilds get unbiased estimates;
+        `message_count_stderr` is their standard error (0 where nothing was sampled).
+        """
         conn = self.get_connection()
         cursor = conn.cursor()
         
         since_date = datetime.now() - timedelta(days=days)
+        until_id = '' if max_id is None else 'AND id <= ?'
         
-        cursor.execute('''
-        SELECT channel_id, COUNT(*) as message_count, AVG(message_length) as avg_length
+        cursor.execute(f'''
+        SELECT channel_id, SUM(weight) as message_count, SUM(weight * message_length) / SUM(weight) as avg_length,
+               SUM(weight * weight) as weight_squares
         FROM message_analytics 
-        WHERE guild_id = ? AND timestamp >= ?
+        WHERE guild_id = ? AND timestamp >= ? {until_id}
         GROUP BY channel_id
         ORDER BY message_count DESC
-        ''', (guild_id, since_date))
+        ''', (guild_id, since_date) if max_id is None else (guild_id, since_date, max_id))
+        
+        rows = [dict(row) for row in cursor.fetchall()]
+        
+        archived = self._archived(guild_id, 'message_analytics', days, since_date,
+                                  ['channel_id', 'message_length', 'weight'])
+        if archived is not None:
+            rows = self._merge_archived_channels(rows, archived)
+        
+        for row in rows:
+            row['message_count_stderr'] = round(standard_error(row['message_count'], row.pop('weight_squares')), 1)
+            row['message_count'] = round(row['message_count'])
+        
+        # Attach length percentiles merged from the hourly histograms
+        histograms = self.get_message_length_histograms(guild_id, days)
+        for row in rows:
+            histogram = histograms.get(row['channel_id'], LengthHistogram())
+            row.update(histogram.percentiles())
+        
+        return rows
+    
+    def get_message_length_histograms(self, guild_id: int, days: int = 7) -> Dict[int, LengthHistogram]:
+        """Merge hourly length histograms into one histogram per channel"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        # Histograms have hour resolution, so include the partial first hour
+        since_hour = (datetime.now() - timedelta(days=days)).replace(minute=0, second=0, microsecond=0)
+        
+        cursor.execute('''
+        SELECT channel_id, bucket, SUM(count) as count
+        FROM message_length_histograms
+        WHERE guild_id = ? AND hour >= ?
+        GROUP BY channel_id, bucket
+        ''', (guild_id, since_hour.strftime('%Y-%m-%d %H:00:00')))
+        
+        histograms: Dict[int, LengthHistogram] = {}
+        for row in cursor.fetchall():
+            histograms.setdefault(row['channel_id'], LengthHistogram()).add_bucket(row['bucket'], row['count'])
+        
+        archived = self._archived(guild_id, 'message_length_histograms', days, since_hour, ['channel_id', 'bucket', 'count'])
+        if archived is not None:
+            from src.archive import group_totals
+            for (channel_id, bucket), count in group_totals(
+                [archived['channel_id'], archived['bucket']], archived['count']
+            ).items():
+                histograms.setdefault(channel_id, LengthHistogram()).add_bucket(bucket, count)
+        return histograms
+    
+    def get_message_length_percentiles(self, guild_id: int, days: int = 7) -> Dict[str, Optional[float]]:
+        """Get guild-wide message length percentiles for the last N days"""
+        merged = LengthHistogram()
+        for histogram in self.get_message_length_histograms(guild_id, days).values():
+            merged.merge(histogram)
+        return merged.percentiles(DEFAULT_PERCENTILES)
+    
+    def get_hourly_message_counts(self, guild_id: int, days: int = 30) -> List[Tuple[int, float]]:
+        """Get (hour start as unix seconds, message count) pairs from the hourly rollups"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = None  # Plain tuples; these feed straight into NumPy
+        
+        since_hour = (datetime.now() - timedelta(days=days)).replace(minute=0, second=0, microsecond=0)
+        
+        cursor.execute('''
+        SELECT CAST(strftime('%s', hour) AS INTEGER) as hour_start, SUM(count) as message_count
+        FROM message_length_histograms
+        WHERE guild_id = ? AND hour >= ?
+        GROUP BY hour
+        ''', (guild_id, since_hour.strftime('%Y-%m-%d %H:00:00')))
         
         rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        
+        archived = self._archived(guild_id, 'message_length_histograms', days, since_hour, ['count'])
+        if archived is not None:
+            from src.archive import group_totals
+            rows.extend(group_totals(archived['hour'], archived['count']).items())
+        return rows
+    
+    def get_hourly_voice_minutes(self, guild_id: int, days: int = 30) -> List[Tuple[int, float]]:
+        """Get (hour start as unix seconds, voice minutes) pairs from the hourly voice rollup"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        
+        since_hour = (datetime.now() - timedelta(days=days)).replace(minute=0, second=0, microsecond=0)
+        
+        cursor.execute('''
+        SELECT CAST(strftime('%s', hour) AS INTEGER) as hour_start, minutes
+        FROM voice_minutes_hourly
+        WHERE guild_id = ? AND hour >= ?
+        ''', (guild_id, since_hour.strftime('%Y-%m-%d %H:00:00')))
+        
+        rows = cursor.fetchall()
+        
+        archived = self._archived(guild_id, 'voice_minutes_hourly', days, since_hour, ['minutes'])
+        if archived is not None:
+            rows.extend(zip(archived['hour'].tolist(), archived['minutes'].tolist()))
+        return rows
+    
+    def get_server_summary(self, guild_id: int, days: int = 7) -> Optional[Dict]:
+        """Get aggregated server totals for the last N days, or None without data"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        since_date = datetime.now() - timedelta(days=days)
+        window = span_window(since_date)
+        
+        # Each span counts once per snapshot it stands for inside the window
+        cursor.execute(f'''
+        SELECT COALESCE(SUM(points), 0) as data_points,
+               COALESCE(SUM(message_count * points), 0) as message_count,
+               COALESCE(SUM(voice_minutes * points), 0) as voice_minutes
+        FROM (
+            SELECT message_count, voice_minutes, {SPAN_POINTS} as points
+            FROM server_analytics
+            WHERE guild_id = ? AND {SPAN_WINDOW}
+        )
+        ''', (window[1], guild_id, *window))
+        totals = dict(cursor.fetchone())
+        live_points = totals['data_points']
+        
+        archived = self._archived(guild_id, 'server_analytics', days, since_date,
+                                  ['member_count', 'channel_count', 'message_count', 'voice_minutes'])
+        if archived is not None:
+            totals['data_points'] += int(archived['points'].sum())
+            totals['message_count'] += int((archived['message_count'] * archived['points']).sum())
+            totals['voice_minutes'] += int((archived['voice_minutes'] * archived['points']).sum())
+        
+        if not totals['data_points']:
+            return None
+        
+        if live_points:
+            cursor.execute(f'''
+            SELECT member_count, channel_count FROM server_analytics
+            WHERE guild_id = ? AND {SPAN_WINDOW}
+            ORDER BY timestamp DESC, id DESC LIMIT 1
+            ''', (guild_id, *window))
+            totals.update(dict(cursor.fetchone()))
+        else:
+            latest = int(archived['timestamp'].argmax())
+            totals['member_count'] = int(archived['member_count'][latest])
+            totals['channel_count'] = int(archived['channel_count'][latest])
+        
+        # Top channel from the hourly rollups (weighted counts), which the covering index answers alone
+        since_hour = since_date.replace(minute=0, second=0, microsecond=0)
+        archived_hours = self._archived(guild_id, 'message_length_histograms', days, since_hour, ['channel_id', 'count'])
+        cursor.execute('''
+        SELECT channel_id, SUM(count) as message_count
+        FROM message_length_histograms
+        WHERE guild_id = ? AND hour >= ?
+        GROUP BY channel_id
+        ORDER BY message_count DESC LIMIT ?
+        ''', (guild_id, since_hour.strftime('%Y-%m-%d %H:00:00'), 1 if archived_hours is None else -1))
+        channels = {row['channel_id']: row['message_count'] for row in cursor.fetchall()}
+        if archived_hours is not None:
+            from src.archive import group_totals
+            for channel_id, count in group_totals(archived_hours['channel_id'], archived_hours['count']).items():
+                channels[channel_id] = channels.get(channel_id, 0) + count
+        top = max(channels, key=channels.get, default=None)
+        totals['top_channel'] = {'channel_id': top, 'message_count': round(channels[top])} if top is not None else None
+        
+        return totals
+    
+    def get_guild_ids(self, days: int = 7) -> List[int]:
+        """Get every guild with server analytics in the last N days"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        since_date = datetime.now() - timedelta(days=days)
+        
+        cursor.execute(f'''
+        SELECT DISTINCT guild_id FROM server_analytics
+        WHERE {SPAN_WINDOW}
+        ORDER BY guild_id
+        ''', span_window(since_date))
+        
+        guild_ids = [row['guild_id'] for row in cursor.fetchall()]
+        
+        if self.archive_dir and days > self.retention_days:
+            archived = self.get_archive().guild_ids(calendar.timegm(since_date.timetuple()))
+            guild_ids = sorted(set(guild_ids).union(archived))
+        return guild_ids
+    
+    def get_member_growth(self, guild_id: int, days: int = 7) -> Optional[Dict]:
+        """Get member counts at the start and end of the last N days"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        since_date = datetime.now() - timedelta(days=days)
+        
+        counts = []
+        for order in ('ASC', 'DESC'):
+            cursor.execute(f'''
+            SELECT member_count FROM server_analytics
+            WHERE guild_id = ? AND {SPAN_WINDOW}
+            ORDER BY timestamp {order}, id {order} LIMIT 1
+            ''', (guild_id, *span_window(since_date)))
+            row = cursor.fetchone()
+            counts.append(row['member_count'] if row else None)
+        start, end = counts
+        
+        archived = self._archived(guild_id, 'server_analytics', days, since_date, ['member_count'])
+        if archived is not None and archived['timestamp'].size:
+            # The archive holds the oldest part of the window
+            start = int(archived['member_count'][archived['timestamp'].argmin()])
+            if end is None:
+                end = int(archived['member_count'][archived['timestamp'].argmax()])
+        
+        if start is None:
+            return None
+        return {
+            'start': start,
+            'end': end,
+            'change': end - start,
+            'percent': round((end - start) / start * 100, 1) if start else None
+        }
+    
+    def get_active_user_count(self, guild_id: int, days: int = 7) -> int:
+        """Get the number of distinct members who sent messages in the last N days
+        
+        For guilds whose messages were sampled this only counts members with a
+        sampled message, so it is a lower bound.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        since_date = datetime.now() - timedelta(days=days)
+        
+        archived = self._archived(guild_id, 'message_analytics', days, since_date, ['user_id'])
+        if archived is None:
+            cursor.execute('''
+            SELECT COUNT(DISTINCT user_id) FROM message_analytics
+            WHERE guild_id = ? AND timestamp >= ?
+            ''', (guild_id, since_date))
+            return cursor.fetchone()[0]
+        
+        cursor.execute('''
+        SELECT DISTINCT user_id FROM message_analytics
+        WHERE guild_id = ? AND timestamp >= ?
+        ''', (guild_id, since_date))
+        users = {row['user_id'] for row in cursor.fetchall()}
+        users.update(archived['user_id'].tolist())
+        return len(users)
+    
+    def get_live_cursor(self) -> Dict:
+        """Get the newest server and message row ids; live deltas carry rows written after them"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM server_analytics')
+        server_id = cursor.fetchone()[0]
+        cursor.execute('SELECT COALESCE(MAX(id), 0) FROM message_analytics')
+        message_id = cursor.fetchone()[0]
+        
+        return {'server_id': server_id, 'message_id': message_id}
+    
+    def get_live_snapshot(self, guild_id: int) -> Dict:
+        """Get the latest server snapshot and the row cursors live deltas start from"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''
+        SELECT {SNAPSHOT_COLUMNS} FROM server_analytics
+        WHERE guild_id = ?
+        ORDER BY id DESC LIMIT 1
+        ''', (guild_id,))
+        latest = cursor.fetchone()
+        
+        return {
+            **self.get_live_cursor(),
+            # The guild's open span; snapshots it gains later are sent as deltas too
+            'span': {'id': latest['id'], 'count': latest['span_count']} if latest else None,
+            'latest': expand_snapshot_span(latest, first=latest['span_count'] - 1)[0] if latest else None
+        }
+    
+    def get_live_delta(self, guild_id: int, since: Dict) -> Dict:
+        """Get rows written for a guild after the given cursors.
+        
+        Cursors advance to the global max id so each poll only scans rows
+        written since the previous one, whichever guild they belong to.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        until = self.get_live_cursor()
+        server_id, message_id = until['server_id'], until['message_id']
+        
+        # Snapshots added to the open span, then those of rows written since
+        span = since.get('span')
+        server_rows = []
+        if span is not None:
+            cursor.execute(f'SELECT {SNAPSHOT_COLUMNS} FROM server_analytics WHERE id = ?', (span['id'],))
+            row = cursor.fetchone()
+            if row is not None:
+                server_rows.extend(expand_snapshot_span(row, first=span['count']))
+                span = {'id': row['id'], 'count': row['span_count']}
+        
+        cursor.execute(f'''
+        SELECT {SNAPSHOT_COLUMNS} FROM server_analytics
+        WHERE id > ? AND id <= ? AND guild_id = ?
+        ORDER BY id
+        ''', (since['server_id'], server_id, guild_id))
+        for row in cursor.fetchall():
+            server_rows.extend(expand_snapshot_span(row))
+            span = {'id': row['id'], 'count': row['span_count']}
+        server_rows.reverse()
+        
+        cursor.execute('''
+        SELECT channel_id, SUM(weight) as message_count, SUM(weight * message_length) as total_length
+        FROM message_analytics
+        WHERE id > ? AND id <= ? AND guild_id = ?
+        GROUP BY channel_id
+        ''', (since['message_id'], message_id, guild_id))
+        message_rows = [dict(row) for row in cursor.fetchall()]
+        
+        return {
+            'server_analytics': server_rows,
+            'message_analytics': message_rows,
+            'cursor': {'server_id': server_id, 'message_id': message_id, 'span': span}
+        }
     
     def get_user_activity_stats(self, guild_id: int, days: int = 7) -> List[Dict]:
         """Get user activity statistics"""
@@ -163,9 +808,122 @@ class Database:
         ORDER BY activity_count DESC
         ''', (guild_id, since_date))
         
+        rows = [dict(row) for row in cursor.fetchall()]
+        
+        archived = self._archived(guild_id, 'user_activity', days, since_date, ['user_id', 'activity_type', 'duration'])
+        if archived is not None and archived['user_id'].size:
+            from src.archive import group_totals
+            merged = {(row['user_id'], row['activity_type']): row for row in rows}
+            for activity_type in set(archived['activity_type'].tolist()):
+                matching = archived['activity_type'] == activity_type
+                users = archived['user_id'][matching]
+                durations = group_totals(users, archived['duration'][matching])
+                for user_id, count in group_totals(users).items():
+                    row = merged.setdefault((user_id, activity_type), {
+                        'user_id': user_id, 'activity_type': activity_type, 'activity_count': 0, 'total_duration': 0
+                    })
+                    row['activity_count'] += int(count)
+                    row['total_duration'] = (row['total_duration'] or 0) + int(durations[user_id])
+            rows = sorted(merged.values(), key=lambda row: row['activity_count'], reverse=True)
+        
+        return rows
+    
+    def log_anomaly_event(self, guild_id: int, kind: str, observed: int, expected: float, score: Optional[float],
+                          bucket_seconds: int, channel_id: Optional[int] = None, timestamp: Optional[datetime] = None):
+        """Record a rate anomaly (channel_id is None for guild-wide rates)"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        INSERT INTO anomaly_events (guild_id, channel_id, kind, observed, expected, score, bucket_seconds, timestamp)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (guild_id, channel_id, kind, observed, expected, score, bucket_seconds,
+              sql_timestamp(timestamp or datetime.now(timezone.utc))))
+        
+        conn.commit()
+    
+    def get_anomaly_events(self, guild_id: int, days: int = 7, limit: int = 50) -> List[Dict]:
+        """Get the most recent anomalies for the last N days"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        since_date = datetime.now() - timedelta(days=days)
+        
+        cursor.execute('''
+        SELECT guild_id, channel_id, kind, observed, expected, score, bucket_seconds, timestamp
+        FROM anomaly_events
+        WHERE guild_id = ? AND timestamp >= ?
+        ORDER BY timestamp DESC, id DESC
+        LIMIT ?
+        ''', (guild_id, sql_timestamp(since_date), limit))
+        
         rows = cursor.fetchall()
         return [dict(row) for row in rows]
     
+    def start_backfill(self, guild_id: int, channel_ids: List[int], until: datetime):
+        """Register channels for backfill; existing checkpoints are kept so runs resume"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.executemany('''
+        INSERT OR IGNORE INTO backfill_checkpoints (guild_id, channel_id, until_timestamp)
+        VALUES (?, ?, ?)
+        ''', [(guild_id, channel_id, sql_timestamp(until)) for channel_id in channel_ids])
+        
+        conn.commit()
+    
+    def get_backfill_checkpoints(self, guild_id: int) -> Dict[int, Dict]:
+        """Get backfill checkpoints keyed by channel id"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT * FROM backfill_checkpoints WHERE guild_id = ?
+        ''', (guild_id,))
+        
+        return {row['channel_id']: dict(row) for row in cursor.fetchall()}
+    
+    def save_backfill_batch(self, guild_id: int, channel_id: int, rows: List[Tuple[int, int, int, int, str]],
+                            last_message_id: Optional[int], completed: bool = False):
+        """Write a batch of backfilled messages and advance the channel checkpoint atomically"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        self._insert_message_rows(cursor, rows)
+        
+        cursor.execute('''
+        UPDATE backfill_checkpoints
+        SET last_message_id = COALESCE(?, last_message_id),
+            message_count = message_count + ?,
+            completed = ?,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE guild_id = ? AND channel_id = ?
+        ''', (last_message_id, len(rows), int(completed), guild_id, channel_id))
+        
+        conn.commit()
+    
+    def get_backfill_progress(self, guild_id: int) -> Optional[Dict]:
+        """Get overall backfill progress for a guild, or None if never backfilled"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+        SELECT COUNT(*) as channels_total,
+               COALESCE(SUM(completed), 0) as channels_completed,
+               COALESCE(SUM(message_count), 0) as message_count,
+               MAX(updated_at) as updated_at
+        FROM backfill_checkpoints
+        WHERE guild_id = ?
+        ''', (guild_id,))
+        
+        progress = dict(cursor.fetchone())
+        if not progress['channels_total']:
+            return None
+        
+        progress['completed'] = progress['channels_completed'] == progress['channels_total']
+        progress['percent'] = round(100 * progress['channels_completed'] / progress['channels_total'])
+        return progress
+    
     def store_oauth_session(self, user_id: int, access_token: str, refresh_token: Optional[str] = None, expires_at: Optional[datetime] = None):
         """Store OAuth session data"""
         conn = self.get_connection()
@@ -190,18 +948,121 @@ class Database:
         row = cursor.fetchone()
         return dict(row) if row else None
     
-    def cleanup_old_data(self, days: int = 30):
-        """Clean up old analytics data"""
+    def get_archive(self):
+        """The cold archive, opened on first use (None when archiving is disabled)"""
+        if self.archive is None and self.archive_dir:
+            from src.archive import ColdArchive
+            self.archive = ColdArchive(self.archive_dir)
+        return self.archive
+    
+    def _archived(self, guild_id: int, table: str, days: int, since: datetime, columns: List[str]) -> Optional[Dict]:
+        """Archived columns (plus the time column) for a window reaching past retention, else None.
+        
+        Server snapshots come back as spans, with `points` holding how many of each span's
+        snapshots fall inside the window.
+        """
+        if not self.archive_dir or days <= self.retention_days:
+            return None
+        self.check_budget()
+        since_epoch = calendar.timegm(since.timetuple())
+        if table != 'server_analytics':
+            archived = self.get_archive().read(guild_id, table, columns, since_epoch)
+            self.check_budget()
+            return archived
+        
+        columns = list(dict.fromkeys([*columns, 'span_count', 'sample_interval']))
+        spans = self.get_archive().read(guild_id, table, columns, since_epoch - MAX_SPAN_SECONDS)
+        self.check_budget()
+        starts, counts, intervals = spans['timestamp'], spans['span_count'], spans['sample_interval']
+        skipped = (-((starts - since_epoch) // intervals)).clip(0, counts)
+        keep = skipped < counts
+        spans = {name: values[keep] for name, values in spans.items()}
+        spans['points'] = counts[keep] - skipped[keep]
+        return spans
+    
+    def _merge_archived_channels(self, rows: List[Dict], archived: Dict) -> List[Dict]:
+        """Fold archived (weighted) messages into per-channel rows, most active first"""
+        from src.archive import group_totals
+        weights = archived['weight']
+        lengths = group_totals(archived['channel_id'], archived['message_length'] * weights)
+        squares = group_totals(archived['channel_id'], weights * weights)
+        merged = {row['channel_id']: row for row in rows}
+        for channel_id, count in group_totals(archived['channel_id'], weights).items():
+            row = merged.setdefault(channel_id, {'channel_id': channel_id, 'message_count': 0, 'avg_length': 0.0,
+                                                 'weight_squares': 0.0})
+            if 'avg_length' in row:
+                total_length = (row['avg_length'] or 0) * row['message_count'] + lengths[channel_id]
+                row['avg_length'] = total_length / (row['message_count'] + count)
+            if 'weight_squares' in row:
+                row['weight_squares'] += squares[channel_id]
+            row['message_count'] += count
+        return sorted(merged.values(), key=lambda row: row['message_count'], reverse=True)
+    
+    def archive_old_data(self, cutoff: datetime) -> int:
+        """Move rows older than `cutoff` (an hour boundary) into the cold archive; returns rows moved"""
+        import numpy as np
+        from src.archive import TABLES
+        
+        archive = self.get_archive()
         conn = self.get_connection()
         cursor = conn.cursor()
+        cursor.row_factory = None
         
-        cutoff_date = datetime.now() - timedelta(days=days)
+        cutoff_value = sql_timestamp(cutoff)
+        # Snapshot spans reaching past the cutoff stay live until a later run, whole
+        expired = {table: SPAN_BEFORE if table == 'server_analytics' else f'{time_column} < ?'
+                   for table, (time_column, _) in TABLES.items()}
+        guild_ids = set()
+        for table in TABLES:
+            cursor.execute(f'SELECT DISTINCT guild_id FROM {table} WHERE {expired[table]}', (cutoff_value,))
+            guild_ids.update(row[0] for row in cursor.fetchall())
         
-        tables = ['server_analytics', 'message_analytics', 'user_activity']
-        for table in tables:
+        moved = 0
+        for guild_id in sorted(guild_ids):
+            tables = {}
+            for table, (time_column, columns) in TABLES.items():
+                selected = ', '.join(name if dtype == 'category' else f'COALESCE({name}, 0)'
+                                     for name, dtype in columns.items())
+                cursor.execute(f'''
+                SELECT CAST(strftime('%s', {time_column}) AS INTEGER), {selected}
+                FROM {table}
+                WHERE guild_id = ? AND {expired[table]}
+                ''', (guild_id, cutoff_value))
+                rows = cursor.fetchall()
+                if not rows:
+                    continue
+                values = list(zip(*rows))
+                tables[table] = {time_column: np.array(values[0], dtype='<i8')}
+                for (name, dtype), column in zip(columns.items(), values[1:]):
+                    tables[table][name] = np.array(column, dtype=object if dtype == 'category' else dtype)
+            
+            # Files first: if we stop before the delete commits, the next run skips what was written
+            moved += archive.append(guild_id, tables, until=calendar.timegm(cutoff.timetuple()))
+            for table in TABLES:
+                cursor.execute(f'DELETE FROM {table} WHERE guild_id = ? AND {expired[table]}', (guild_id, cutoff_value))
+            conn.commit()
+        
+        return moved
+    
+    def cleanup_old_data(self, days: int = 30) -> int:
+        """Archive (when enabled) and then delete analytics older than N days; returns rows archived"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        # Whole hours, so hourly rollups and raw rows are cut at the same boundary
+        cutoff_date = (datetime.now() - timedelta(days=days)).replace(minute=0, second=0, microsecond=0)
+        archived = self.archive_old_data(cutoff_date) if self.archive_dir else 0
+        
+        # Snapshot spans go once their last point is past the cutoff
+        cursor.execute(f'DELETE FROM server_analytics WHERE {SPAN_BEFORE}', (sql_timestamp(cutoff_date),))
+        for table in ('message_analytics', 'user_activity', 'anomaly_events'):
             cursor.execute(f'DELETE FROM {table} WHERE timestamp < ?', (cutoff_date,))
         
+        for table in ('message_length_histograms', 'voice_minutes_hourly'):
+            cursor.execute(f'DELETE FROM {table} WHERE hour < ?', (cutoff_date.strftime('%Y-%m-%d %H:00:00'),))
+        
         conn.commit()
+        return archived
 
-# Global database instance
-db = Database()
\ No newline at end of file
+# Global database instance (lazy: connects on first query)
+db = Database(archive_dir=Config.ARCHIVE_DIR or None, retention_days=Config.DATA_RETENTION_DAYS)
\ No newline at end of file
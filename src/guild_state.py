@@ -0,0 +1,163 @@
+"""
+Slim per-guild runtime state for Rations Discord Analytics Bot
+"""
+import os
+import sys
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from src.anomaly import RateDetector, RatePolicy
+from src.collection import CollectionPolicy, MinuteCounter, SnapshotSchedule
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class GuildState:
+    """Everything the bot keeps in memory about one guild.
+
+    Slotted so that thousands of guilds don't each carry an instance dict;
+    voice sessions store plain unix timestamps rather than datetimes. Rate
+    detectors, the message counter and the collection schedule are created
+    on first use, and per-channel detectors are capped by the registry, so
+    a guild's footprint stays bounded however many channels it has.
+    """
+
+    __slots__ = ('guild_id', 'voice_sessions', 'message_rate', 'join_rate', 'channel_rates', 'message_counter',
+                 'collection')
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.voice_sessions: Dict[int, float] = {}  # user_id -> join time
+        self.message_rate: Optional[RateDetector] = None
+        self.join_rate: Optional[RateDetector] = None
+        self.channel_rates: Optional[OrderedDict] = None  # channel_id -> RateDetector, least recent first
+        self.message_counter: Optional[MinuteCounter] = None
+        self.collection: Optional[SnapshotSchedule] = None
+
+    def voice_minutes(self, now: float) -> float:
+        """Minutes spent in voice so far by members currently connected"""
+        return sum(now - joined for joined in self.voice_sessions.values()) / 60
+
+    def messages_last_hour(self, now: float) -> int:
+        return self.message_counter.total(now) if self.message_counter is not None else 0
+
+    def messages_per_minute(self, now: float, minutes: int = 5) -> float:
+        """Message rate over the last `minutes`, or over the current minute if that is higher (a surge)"""
+        if self.message_counter is None:
+            return 0.0
+        return max(self.message_counter.rate(now, minutes), self.message_counter.rate(now, 1))
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by this record and its containers"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.voice_sessions)
+        size += len(self.voice_sessions) * (sys.getsizeof(0) + sys.getsizeof(0.0))
+        for detector in (self.message_rate, self.join_rate, self.collection):
+            if detector is not None:
+                size += sys.getsizeof(detector)
+        if self.message_counter is not None:
+            size += sys.getsizeof(self.message_counter) + sys.getsizeof(self.message_counter.counts)
+        if self.channel_rates is not None:
+            size += sys.getsizeof(self.channel_rates)
+            size += sum(sys.getsizeof(detector) for detector in self.channel_rates.values())
+        return size
+
+
+class GuildStateRegistry:
+    """Creates GuildState records on demand, feeds their counters and detectors and reports their footprint"""
+
+    def __init__(self, message_policy: Optional[RatePolicy] = None, join_policy: Optional[RatePolicy] = None,
+                 max_channels: int = 32, collection_policy: Optional[CollectionPolicy] = None):
+        self.states: Dict[int, GuildState] = {}
+        self.message_policy = message_policy or RatePolicy()
+        self.join_policy = join_policy or RatePolicy(min_events=10)
+        self.max_channels = max_channels
+        self.collection_policy = collection_policy or CollectionPolicy()
+
+    def get(self, guild_id: int) -> GuildState:
+        state = self.states.get(guild_id)
+        if state is None:
+            state = self.states[guild_id] = GuildState(guild_id)
+        return state
+
+    def collection(self, guild_id: int) -> SnapshotSchedule:
+        state = self.get(guild_id)
+        if state.collection is None:
+            state.collection = SnapshotSchedule(self.collection_policy)
+        return state.collection
+
+    def observe_message(self, guild_id: int, channel_id: int, timestamp: float) -> List[Dict]:
+        """Count one message and feed it to the guild and channel detectors; return any anomalies it triggers"""
+        state = self.get(guild_id)
+        if state.message_counter is None:
+            state.message_counter = MinuteCounter()
+        state.message_counter.add(timestamp)
+        if state.collection is not None:
+            state.collection.wake(timestamp)
+
+        if state.message_rate is None:
+            state.message_rate = RateDetector(self.message_policy)
+        if state.channel_rates is None:
+            state.channel_rates = OrderedDict()
+
+        channels = state.channel_rates
+        channel_rate = channels.get(channel_id)
+        if channel_rate is None:
+            channel_rate = channels[channel_id] = RateDetector(self.message_policy)
+            if len(channels) > self.max_channels:
+                channels.popitem(last=False)
+        else:
+            channels.move_to_end(channel_id)
+
+        anomalies = []
+        for scope, detector in ((None, state.message_rate), (channel_id, channel_rate)):
+            anomaly = detector.observe(timestamp)
+            if anomaly is not None:
+                anomaly.update(kind='messages', channel_id=scope)
+                anomalies.append(anomaly)
+        return anomalies
+
+    def observe_join(self, guild_id: int, timestamp: float) -> Optional[Dict]:
+        """Feed one member join to the guild's join detector"""
+        state = self.get(guild_id)
+        if state.join_rate is None:
+            state.join_rate = RateDetector(self.join_policy)
+
+        anomaly = state.join_rate.observe(timestamp)
+        if anomaly is not None:
+            anomaly.update(kind='joins', channel_id=None)
+        return anomaly
+
+    def discard(self, guild_id: int):
+        self.states.pop(guild_id, None)
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    def memory_report(self, guild_count: int) -> Dict:
+        """Process RSS and tracked state, overall and per guild"""
+        rss = current_rss_bytes()
+        state_bytes = sum(state.memory_bytes() for state in self.states.values())
+        return {
+            'rss_bytes': rss,
+            'guilds': guild_count,
+            'rss_per_guild_bytes': rss // guild_count if guild_count else 0,
+            'state_bytes': state_bytes,
+            'state_per_guild_bytes': state_bytes // len(self.states) if self.states else 0
+        }
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return peak if sys.platform == 'darwin' else peak * 1024
+    return 0
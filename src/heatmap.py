@@ -0,0 +1,78 @@
+"""
+Hour-of-week activity heatmaps for Rations Discord Analytics Bot
+"""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+DAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+HOURS_PER_WEEK = 7 * 24
+
+
+def hour_of_week(epoch_seconds: np.ndarray) -> np.ndarray:
+    """Map unix timestamps to 0..167 (Monday 00:00 UTC is 0)"""
+    hours = epoch_seconds // 3600
+    # 1970-01-01 was a Thursday, three days after a Monday
+    return ((hours // 24 + 3) % 7) * 24 + hours % 24
+
+
+def bin_by_hour_of_week(epoch_seconds: np.ndarray, weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """Sum weights (or count events) into a 7x24 day-by-hour matrix"""
+    if epoch_seconds.size == 0:
+        return np.zeros((7, 24))
+    counts = np.bincount(hour_of_week(epoch_seconds), weights=weights, minlength=HOURS_PER_WEEK)
+    return counts.astype(float).reshape(7, 24)
+
+
+def compute_activity_heatmap(database, guild_id: int, days: int = 30) -> Dict:
+    """Build the message and voice heatmaps for a guild from the hourly rollups"""
+    messages = _bin_hourly(database.get_hourly_message_counts(guild_id, days))
+    voice = _bin_hourly(database.get_hourly_voice_minutes(guild_id, days))
+
+    return {
+        'days': DAY_NAMES,
+        'timezone': 'UTC',
+        'messages': np.round(messages).astype(int).tolist(),
+        'voice_minutes': np.round(voice).astype(int).tolist(),
+        'peak_message_hour': _peak(messages),
+        'peak_voice_hour': _peak(voice)
+    }
+
+
+def _bin_hourly(rows) -> np.ndarray:
+    hourly = np.array(rows, dtype=float).reshape(-1, 2)
+    return bin_by_hour_of_week(hourly[:, 0].astype(np.int64), weights=hourly[:, 1])
+
+
+def _peak(matrix: np.ndarray) -> Optional[Dict]:
+    if not matrix.any():
+        return None
+    day, hour = np.unravel_index(int(np.argmax(matrix)), matrix.shape)
+    return {'day': DAY_NAMES[day], 'hour': int(hour)}
+
+
+class HeatmapCache:
+    """Per-(guild, window) heatmaps, recomputed at most once per `ttl` seconds"""
+
+    def __init__(self, database, ttl: float = 300):
+        self.database = database
+        self.ttl = ttl
+        self.entries: Dict[Tuple[int, int], Tuple[float, Dict]] = {}
+        self.lock = threading.Lock()
+
+    def get(self, guild_id: int, days: int = 30) -> Dict:
+        key = (guild_id, days)
+        entry = self.entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+
+        heatmap = compute_activity_heatmap(self.database, guild_id, days)
+        with self.lock:
+            self.entries[key] = (time.monotonic(), heatmap)
+            # Drop expired entries so idle guilds don't accumulate
+            now = time.monotonic()
+            for stale in [k for k, (at, _) in self.entries.items() if now - at >= self.ttl]:
+                del self.entries[stale]
+        return heatmap
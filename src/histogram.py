@@ -0,0 +1,72 @@
+"""
+Mergeable message length histograms for Rations Discord Analytics Bot
+"""
+import math
+from typing import Dict, Iterable, Optional
+
+# Each octave of message length is split into SUB_BUCKETS log-scale buckets,
+# so a bucket's representative value is within ~4.5% of any length it holds.
+# Bucket 0 is reserved for empty messages (attachments, embeds, stickers).
+SUB_BUCKETS = 8
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+def bucket_for_length(length: int) -> int:
+    """Map a message length to its histogram bucket"""
+    if length <= 0:
+        return 0
+    return 1 + int(math.log2(length) * SUB_BUCKETS)
+
+
+def bucket_value(bucket: int) -> float:
+    """Representative length for a bucket (middle of the integers it covers)"""
+    if bucket <= 0:
+        return 0.0
+    low = math.ceil(2 ** ((bucket - 1) / SUB_BUCKETS))
+    high = max(low, math.ceil(2 ** (bucket / SUB_BUCKETS)) - 1)
+    return (low + high) / 2
+
+
+class LengthHistogram:
+    """Sparse bucket -> count histogram that can be merged across hours and channels"""
+
+    def __init__(self, counts: Optional[Dict[int, float]] = None):
+        self.counts: Dict[int, float] = dict(counts or {})
+
+    def add(self, length: int, count: float = 1):
+        """Record `count` messages of the given length"""
+        bucket = bucket_for_length(length)
+        self.counts[bucket] = self.counts.get(bucket, 0) + count
+
+    def add_bucket(self, bucket: int, count: float):
+        """Record `count` messages that already fall into `bucket`"""
+        self.counts[bucket] = self.counts.get(bucket, 0) + count
+
+    def merge(self, other: 'LengthHistogram') -> 'LengthHistogram':
+        """Fold another histogram into this one"""
+        for bucket, count in other.counts.items():
+            self.add_bucket(bucket, count)
+        return self
+
+    @property
+    def total(self) -> float:
+        return sum(self.counts.values())
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Nearest-rank percentile estimate, or None for an empty histogram"""
+        total = self.total
+        if total <= 0:
+            return None
+
+        rank = max(1, math.ceil(p / 100 * total))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return bucket_value(bucket)
+        return bucket_value(max(self.counts))
+
+    def percentiles(self, ps: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[str, Optional[float]]:
+        """Percentile estimates keyed as p50/p90/p99"""
+        return {f'p{p:g}': self.percentile(p) for p in ps}
@@ -0,0 +1,48 @@
+"""
+Sampled message ingestion for Rations Discord Analytics Bot
+
+Every message still feeds the in-memory counters and anomaly detectors, but
+a guild above `max_per_minute` (or with a fixed sample rate) only has a
+random sample of its messages written. Each stored message carries weight
+1/p for its sampling probability p, so weighted sums stay unbiased
+estimates of the true counts, and the sum of w² - w over stored messages
+estimates their variance.
+"""
+import math
+import random
+from typing import Dict, Optional
+
+
+class IngestionPolicy:
+    """Decides which messages are written, and with what weight"""
+
+    def __init__(self, max_per_minute: int = 600, fixed_rates: Optional[Dict[int, float]] = None,
+                 window_minutes: int = 5, rng: Optional[random.Random] = None):
+        self.max_per_minute = max_per_minute  # writes per guild per minute once sampling kicks in; 0 disables it
+        self.fixed_rates = fixed_rates or {}  # guild_id -> share of messages always sampled
+        self.window_minutes = window_minutes  # recent minutes the message rate is measured over
+        self.random = (rng or random.Random()).random
+
+    def reseed(self, seed: int):
+        """Make the sample reproducible, e.g. for replays"""
+        self.random = random.Random(seed).random
+
+    def sample_rate(self, guild_id: int, messages_per_minute: float) -> float:
+        rate = self.fixed_rates.get(guild_id, 1.0)
+        if self.max_per_minute and messages_per_minute > self.max_per_minute:
+            rate = min(rate, self.max_per_minute / messages_per_minute)
+        return rate
+
+    def weight(self, guild_id: int, messages_per_minute: float) -> Optional[float]:
+        """Weight to store a message with, or None to skip writing it"""
+        rate = self.sample_rate(guild_id, messages_per_minute)
+        if rate >= 1:
+            return 1.0
+        if self.random() >= rate:
+            return None
+        return 1.0 / rate
+
+
+def standard_error(weight_sum: float, weight_squares: float) -> float:
+    """Standard error of a weighted count, from the sums of w and w²"""
+    return math.sqrt(max(weight_squares - weight_sum, 0.0))
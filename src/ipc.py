@@ -0,0 +1,188 @@
+"""
+Local change-notification bus between the Rations bot and web processes
+"""
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+
+# Listeners receive (guild_id, updated_at) where updated_at is a unix timestamp
+ChangeListener = Callable[[int, float], None]
+
+
+def unix_sockets_available() -> bool:
+    """Unix domain sockets are missing on older Windows builds"""
+    return hasattr(socket, 'AF_UNIX')
+
+
+class ChangePublisher:
+    """Unix socket server the bot publishes "guild X updated at T" events on.
+
+    Writes mark a guild dirty; a flush thread coalesces them and sends at most
+    one event per guild per flush interval, so a busy guild doesn't turn every
+    message into a notification. Delivery is best effort: subscribers that
+    can't keep up are dropped and reconnect on their own.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, send_timeout: float = 0.5):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.send_timeout = send_timeout
+        self.lock = threading.Lock()
+        self.clients: List[socket.socket] = []
+        self.dirty: Dict[int, float] = {}
+        self.wakeup = threading.Event()
+        self.server = None
+
+    def start(self):
+        """Bind the socket and start the accept and flush threads (idempotent)"""
+        if self.server is not None:
+            return
+        if not unix_sockets_available():
+            print('⚠️ Unix sockets unavailable, change notifications disabled')
+            return
+
+        try:
+            # A previous bot process may have left its socket file behind
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(self.path)
+            server.listen()
+        except OSError as e:
+            print(f'⚠️ Could not open change notification socket {self.path}: {e}')
+            return
+
+        self.server = server
+        threading.Thread(target=self._accept_loop, name='ipc-accept', daemon=True).start()
+        threading.Thread(target=self._flush_loop, name='ipc-flush', daemon=True).start()
+
+    def close(self):
+        """Stop accepting subscribers and remove the socket file"""
+        server, self.server = self.server, None
+        if server is None:
+            return
+        try:
+            # Wakes the accept thread on Linux, where close() alone does not
+            server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        server.close()
+        with self.lock:
+            for client in self.clients:
+                client.close()
+            self.clients = []
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def mark_dirty(self, guild_id: int):
+        """Record that a guild's data changed; sent on the next flush"""
+        if self.server is None:
+            return
+        with self.lock:
+            self.dirty[guild_id] = time.time()
+
+    def flush(self):
+        """Send pending events now, e.g. at the end of a collection tick"""
+        self.wakeup.set()
+
+    def _accept_loop(self):
+        while self.server is not None:
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                break
+            client.settimeout(self.send_timeout)
+            with self.lock:
+                self.clients.append(client)
+
+    def _flush_loop(self):
+        while self.server is not None:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+
+            with self.lock:
+                dirty, self.dirty = self.dirty, {}
+                clients = list(self.clients)
+            if not dirty or not clients:
+                continue
+
+            payload = ''.join(
+                json.dumps({'guild_id': guild_id, 'updated_at': updated_at}) + '\n'
+                for guild_id, updated_at in dirty.items()
+            ).encode()
+
+            for client in clients:
+                try:
+                    client.sendall(payload)
+                except OSError:
+                    with self.lock:
+                        if client in self.clients:
+                            self.clients.remove(client)
+                    client.close()
+
+
+class ChangeSubscriber:
+    """Background client of the change bus that reconnects with backoff"""
+
+    def __init__(self, path: str, max_backoff: float = 30.0):
+        self.path = path
+        self.max_backoff = max_backoff
+        self.listeners: List[ChangeListener] = []
+        self.connected = False
+        self.thread = None
+
+    def add_listener(self, listener: ChangeListener):
+        """Call `listener(guild_id, updated_at)` for every received event"""
+        self.listeners.append(listener)
+
+    def start(self):
+        """Start the reader thread (idempotent)"""
+        if self.thread is not None or not unix_sockets_available():
+            return
+        self.thread = threading.Thread(target=self._run, name='ipc-subscriber', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        backoff = 0.5
+        while True:
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.connect(self.path)
+                    self.connected = True
+                    backoff = 0.5
+                    for line in sock.makefile('rb'):
+                        self._dispatch(line)
+            except OSError:
+                # Bot not running yet, or restarted; fall back to polling until it's back
+                pass
+            finally:
+                self.connected = False
+
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _dispatch(self, line: bytes):
+        try:
+            event = json.loads(line)
+            guild_id, updated_at = int(event['guild_id']), float(event['updated_at'])
+        except (ValueError, KeyError, TypeError):
+            return
+        for listener in self.listeners:
+            try:
+                listener(guild_id, updated_at)
+            except Exception as e:
+                print(f'Change listener error: {e}')
+
+
+# Process-wide endpoints; neither touches the socket until started
+change_publisher = ChangePublisher(Config.IPC_SOCKET_PATH)
+change_subscriber = ChangeSubscriber(Config.IPC_SOCKET_PATH)
@@ -0,0 +1,128 @@
+"""
+Live analytics streaming for Rations Web Dashboard
+"""
+import json
+import queue
+import threading
+import os
+import sys
+from typing import Dict, Iterator, Set
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from src.database import db
+from src.ipc import change_subscriber
+
+
+class Subscription:
+    """One Server-Sent Events viewer of a guild"""
+
+    def __init__(self, guild_id: int, max_queue: int):
+        self.guild_id = guild_id
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.closed = False
+
+    def push(self, event: str, payload: Dict):
+        """Queue an event, closing the subscription if the viewer has fallen behind"""
+        try:
+            self.queue.put_nowait((event, payload))
+        except queue.Full:
+            # The browser reconnects and gets a fresh snapshot
+            self.closed = True
+
+    def events(self, heartbeat: float) -> Iterator[str]:
+        """Yield SSE-formatted frames until the subscription is closed"""
+        yield 'retry: 5000\n\n'
+        while not self.closed:
+            try:
+                event, payload = self.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ': keep-alive\n\n'
+                continue
+            yield f'event: {event}\ndata: {json.dumps(payload, default=str)}\n\n'
+
+
+class AnalyticsBroadcaster:
+    """Per-process poller that fans guild deltas out to every subscriber of that guild.
+
+    The database is queried once per guild per poll, regardless of how many
+    dashboard tabs are watching it. When the bot's change bus is reachable,
+    polls happen as soon as a watched guild is written to; otherwise the
+    poller falls back to its fixed interval.
+    """
+
+    def __init__(self, database, poll_interval: float = 5.0, max_queue: int = 100, changes=None):
+        self.database = database
+        self.changes = changes
+        self.poll_interval = poll_interval
+        self.max_queue = max_queue
+        self.lock = threading.Lock()
+        self.subscribers: Dict[int, Set[Subscription]] = {}
+        self.cursors: Dict[int, Dict] = {}
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def subscribe(self, guild_id: int) -> Subscription:
+        """Register a viewer and queue the current snapshot for it"""
+        subscription = Subscription(guild_id, self.max_queue)
+        with self.lock:
+            if guild_id not in self.cursors:
+                self.cursors[guild_id] = self.database.get_live_snapshot(guild_id)
+            self.subscribers.setdefault(guild_id, set()).add(subscription)
+            subscription.push('snapshot', dict(self.cursors[guild_id]))
+            self._ensure_started()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a viewer; guilds without viewers stop being polled"""
+        with self.lock:
+            subscription.closed = True
+            viewers = self.subscribers.get(subscription.guild_id)
+            if viewers is not None:
+                viewers.discard(subscription)
+                if not viewers:
+                    del self.subscribers[subscription.guild_id]
+                    self.cursors.pop(subscription.guild_id, None)
+
+    def notify(self, guild_id: int, updated_at: float = None):
+        """Wake the poller early when another process reports a write to a watched guild"""
+        if guild_id in self.subscribers:
+            self.wakeup.set()
+
+    def _ensure_started(self):
+        if self.changes is not None:
+            self.changes.start()
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name='analytics-broadcaster', daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+
+            with self.lock:
+                watched = {guild_id: dict(self.cursors[guild_id]) for guild_id in self.subscribers}
+
+            for guild_id, cursor in watched.items():
+                try:
+                    delta = self.database.get_live_delta(guild_id, cursor)
+                except Exception as e:
+                    print(f'Live analytics poll error for guild {guild_id}: {e}')
+                    continue
+
+                with self.lock:
+                    if guild_id not in self.cursors:
+                        continue
+                    self.cursors[guild_id].update(delta['cursor'])
+                    if delta['server_analytics']:
+                        self.cursors[guild_id]['latest'] = delta['server_analytics'][0]
+                    if not delta['server_analytics'] and not delta['message_analytics']:
+                        continue
+                    for subscription in list(self.subscribers.get(guild_id, ())):
+                        subscription.push('delta', delta)
+
+
+# Global broadcaster; its poller thread starts with the first subscriber
+broadcaster = AnalyticsBroadcaster(db, poll_interval=Config.LIVE_POLL_INTERVAL, changes=change_subscriber)
+change_subscriber.add_listener(broadcaster.notify)
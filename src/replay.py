@@ -0,0 +1,249 @@
+"""
+Gateway event recording and replay for Rations Discord Analytics Bot
+
+Recorded logs are JSON lines, one compact array per event:
+
+    ["m", timestamp, guild_id, channel_id, author_id, length]
+    ["v", timestamp, guild_id, user_id, before_channel_id, after_channel_id]
+    ["j", timestamp, guild_id, user_id]
+
+Timestamps are unix seconds. Paths ending in .gz are gzip-compressed.
+
+Replay a log into a fresh database (rebuilding the derived tables) with:
+
+    python -m src.replay events.jsonl.gz --database replay.db --speed max
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MESSAGE_EVENT = 'm'
+VOICE_EVENT = 'v'
+JOIN_EVENT = 'j'
+
+
+def _open_log(path: str, mode: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class EventRecorder:
+    """Appends the gateway events the bot ingests to a compact log"""
+
+    def __init__(self, path: str, flush_every: int = 1000):
+        self.path = path
+        self.flush_every = flush_every
+        self.file = None
+        self.pending = 0
+
+    def record_message(self, message):
+        self.write_event([MESSAGE_EVENT, message.created_at.timestamp(), message.guild.id,
+                          message.channel.id, message.author.id, len(message.content)])
+
+    def record_voice_state(self, member, before, after, when: datetime):
+        self.write_event([VOICE_EVENT, when.timestamp(), member.guild.id, member.id,
+                          before.channel.id if before.channel else None,
+                          after.channel.id if after.channel else None])
+
+    def record_member_join(self, member, when: datetime):
+        self.write_event([JOIN_EVENT, when.timestamp(), member.guild.id, member.id])
+
+    def write_event(self, event: List):
+        """Append one raw event array"""
+        if self.file is None:
+            self.file = _open_log(self.path, 'a')
+        self.file.write(json.dumps(event, separators=(',', ':')) + '\n')
+        self.pending += 1
+        if self.pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+        self.pending = 0
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def read_events(path: str) -> Iterator[List]:
+    """Yield recorded events in file order"""
+    with _open_log(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# Lightweight stand-ins for the discord objects the handlers touch
+
+class FakeGuild:
+    __slots__ = ('id',)
+
+    def __init__(self, id: int):
+        self.id = id
+
+
+class FakeChannel:
+    __slots__ = ('id',)
+
+    def __init__(self, id: int):
+        self.id = id
+
+
+class FakeMember:
+    __slots__ = ('id', 'guild', 'bot')
+
+    def __init__(self, id: int, guild: Optional[FakeGuild] = None):
+        self.id = id
+        self.guild = guild
+        self.bot = False
+
+
+class FakeMessage:
+    __slots__ = ('guild', 'channel', 'author', 'content', 'created_at')
+
+    def __init__(self, guild, channel, author, content: str, created_at: datetime):
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+        self.content = content
+        self.created_at = created_at
+
+
+class FakeVoiceState:
+    __slots__ = ('channel',)
+
+    def __init__(self, channel: Optional[FakeChannel]):
+        self.channel = channel
+
+
+class ReplayEngine:
+    """Feeds recorded events through a bot's event handlers without a gateway.
+
+    `speed` of None replays as fast as the handlers go; 1.0 is real time and
+    larger values compress the recorded gaps. The bot's clock follows the
+    recorded timestamps, so voice durations match the original session, and
+    message sampling for guilds over the ingestion cap is seeded, so replaying
+    the same log stores the same sample.
+    """
+
+    def __init__(self, bot, speed: Optional[float] = None, seed: int = 0):
+        self.bot = bot
+        self.speed = speed
+        self.current = datetime.now(timezone.utc)
+        self.guilds: Dict[int, FakeGuild] = {}
+        self.channels: Dict[int, FakeChannel] = {}
+
+        async def skip_commands(message):
+            return None
+
+        # Event time instead of wall time, and no text command parsing
+        bot.now = lambda: self.current
+        bot.process_commands = skip_commands
+        bot.ingestion.reseed(seed)
+
+        # Replayed events are already on record; recording them again would grow the log being replayed
+        if bot.recorder is not None:
+            bot.recorder.close()
+            bot.recorder = None
+
+    def _guild(self, guild_id: int) -> FakeGuild:
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            guild = self.guilds[guild_id] = FakeGuild(guild_id)
+        return guild
+
+    def _channel(self, channel_id: Optional[int]) -> Optional[FakeChannel]:
+        if channel_id is None:
+            return None
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            channel = self.channels[channel_id] = FakeChannel(channel_id)
+        return channel
+
+    async def replay(self, events: Iterable[List]) -> Dict:
+        """Replay events in order and return throughput stats"""
+        counts = {MESSAGE_EVENT: 0, VOICE_EVENT: 0, JOIN_EVENT: 0}
+        first_ts = None
+        started = time.perf_counter()
+
+        for event in events:
+            kind, ts = event[0], event[1]
+
+            if self.speed is not None:
+                if first_ts is None:
+                    first_ts = ts
+                delay = (ts - first_ts) / self.speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            self.current = datetime.fromtimestamp(ts, timezone.utc)
+
+            if kind == MESSAGE_EVENT:
+                _, _, guild_id, channel_id, author_id, length = event
+                guild = self._guild(guild_id)
+                message = FakeMessage(guild, self._channel(channel_id), FakeMember(author_id, guild),
+                                      ' ' * length, self.current)
+                await self.bot.on_message(message)
+            elif kind == VOICE_EVENT:
+                _, _, guild_id, user_id, before_id, after_id = event
+                member = FakeMember(user_id, self._guild(guild_id))
+                await self.bot.on_voice_state_update(
+                    member, FakeVoiceState(self._channel(before_id)), FakeVoiceState(self._channel(after_id))
+                )
+            elif kind == JOIN_EVENT:
+                _, _, guild_id, user_id = event
+                await self.bot.on_member_join(FakeMember(user_id, self._guild(guild_id)))
+            else:
+                continue
+            counts[kind] += 1
+
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        return {
+            'messages': counts[MESSAGE_EVENT],
+            'voice_events': counts[VOICE_EVENT],
+            'member_joins': counts[JOIN_EVENT],
+            'seconds': elapsed,
+            'events_per_second': total / elapsed if elapsed > 0 else 0.0
+        }
+
+
+async def main(argv: Optional[List[str]] = None):
+    """Replay a recorded event log into a database"""
+    parser = argparse.ArgumentParser(description='Replay recorded gateway events through the bot handlers')
+    parser.add_argument('log', help='event log written by the recorder (EVENT_RECORD_PATH)')
+    parser.add_argument('--database', default='replay.db', help='database to write into (default: replay.db)')
+    parser.add_argument('--speed', default='max', help="'max', or a multiple of real time such as 1 or 60")
+    parser.add_argument('--seed', type=int, default=0, help='seed for sampled ingestion in busy guilds (default: 0)')
+    args = parser.parse_args(argv)
+
+    from config import Config
+    if Config.EVENT_RECORD_PATH and os.path.realpath(args.log) == os.path.realpath(Config.EVENT_RECORD_PATH):
+        parser.error('refusing to replay the log EVENT_RECORD_PATH is recording to; replay a copy of it instead')
+
+    from src.database import db
+    # The global database connects lazily, so it can still be redirected here
+    db.db_path = args.database
+
+    from src.bot import bot
+    speed = None if args.speed == 'max' else float(args.speed)
+    stats = await ReplayEngine(bot, speed=speed, seed=args.seed).replay(read_events(args.log))
+
+    print(f"⏩ Replayed {stats['messages']:,} messages, {stats['voice_events']:,} voice events "
+          f"and {stats['member_joins']:,} joins in {stats['seconds']:.2f}s "
+          f"({stats['events_per_second']:,.0f} events/s) into {args.database}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+"""
+Cross-guild batch reports for Rations Discord Analytics Bot
+
+Guilds are split across a process pool. Each worker opens its own read-only
+connection, so reports never block on (or interfere with) the bot's writes.
+The result is written as static JSON and HTML snapshots that the dashboard
+serves as files.
+"""
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from typing import Dict, List, Optional
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from config import Config
+from src.database import Database
+
+TOP_CHANNELS = 5
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+# Read-only database of a pool worker, opened by _init_worker
+_worker_db: Optional[Database] = None
+
+
+def open_read_only(db_path: str) -> Database:
+    """A read-only Database that still sees the cold archive"""
+    return Database(db_path, read_only=True, archive_dir=Config.ARCHIVE_DIR or None,
+                    retention_days=Config.DATA_RETENTION_DAYS)
+
+
+def _init_worker(db_path: str):
+    global _worker_db
+    _worker_db = open_read_only(db_path)
+
+
+def _report_in_worker(guild_id: int, days: int) -> Optional[Dict]:
+    return build_guild_report(_worker_db, guild_id, days)
+
+
+def build_guild_report(database: Database, guild_id: int, days: int = 1) -> Optional[Dict]:
+    """Growth, activity and top channels for one guild, or None without data"""
+    summary = database.get_server_summary(guild_id, days)
+    if summary is None:
+        return None
+
+    channels = database.get_message_analytics(guild_id, days)
+    return {
+        'guild_id': guild_id,
+        'member_count': summary['member_count'],
+        'channel_count': summary['channel_count'],
+        'growth': database.get_member_growth(guild_id, days),
+        'message_count': sum(channel['message_count'] for channel in channels),
+        # Channels are sampled independently, so their variances add
+        'message_count_stderr': round(math.sqrt(sum(channel['message_count_stderr'] ** 2 for channel in channels)), 1),
+        'voice_minutes': summary['voice_minutes'],
+        'active_users': database.get_active_user_count(guild_id, days),
+        'anomaly_count': len(database.get_anomaly_events(guild_id, days)),
+        'top_channels': [
+            {
+                'channel_id': channel['channel_id'],
+                'message_count': channel['message_count'],
+                'message_count_stderr': channel['message_count_stderr'],
+                'avg_length': round(channel['avg_length'] or 0, 1),
+                'p50': channel['p50'],
+                'p90': channel['p90']
+            }
+            for channel in channels[:TOP_CHANNELS]
+        ]
+    }
+
+
+def generate_reports(db_path: str, days: int = 1, workers: int = 1) -> Dict:
+    """Build reports for every guild active in the window, `workers` processes at a time"""
+    started = time.perf_counter()
+    guild_ids = open_read_only(db_path).get_guild_ids(days)
+
+    if workers <= 1:
+        database = open_read_only(db_path)
+        reports = [build_guild_report(database, guild_id, days) for guild_id in guild_ids]
+    else:
+        # A few chunks per worker keeps them busy when guild sizes vary
+        chunksize = max(1, len(guild_ids) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(db_path,)) as pool:
+            reports = list(pool.map(partial(_report_in_worker, days=days), guild_ids, chunksize=chunksize))
+
+    guilds = sorted((report for report in reports if report), key=lambda report: report['message_count'],
+                    reverse=True)
+    return {
+        'generated_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+        'days': days,
+        'guild_count': len(guilds),
+        'totals': {
+            'member_count': sum(guild['member_count'] for guild in guilds),
+            'message_count': sum(guild['message_count'] for guild in guilds),
+            'voice_minutes': sum(guild['voice_minutes'] for guild in guilds),
+            'anomaly_count': sum(guild['anomaly_count'] for guild in guilds)
+        },
+        'workers': max(workers, 1),
+        'seconds': round(time.perf_counter() - started, 3),
+        'guilds': guilds
+    }
+
+
+def render_report_html(report: Dict) -> str:
+    """Render a report as a standalone HTML page"""
+    env = Environment(loader=FileSystemLoader(TEMPLATES_DIR), autoescape=select_autoescape(['html']))
+    return env.get_template('report.html').render(report=report)
+
+
+def write_snapshots(report: Dict, output_dir: str) -> List[str]:
+    """Write dated and `latest` JSON/HTML snapshots; returns the paths written"""
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = report['generated_at'][:10]
+    contents = {
+        'json': json.dumps(report, indent=2),
+        'html': render_report_html(report)
+    }
+
+    paths = []
+    for name in (f'report-{stamp}', 'latest'):
+        for extension, content in contents.items():
+            path = os.path.join(output_dir, f'{name}.{extension}')
+            # Write then rename so the dashboard never serves a half-written file
+            temp_path = path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+            paths.append(path)
+    return paths
@@ -0,0 +1,82 @@
+"""
+API response encoding for Rations Discord Analytics Bot
+
+`?format=columnar` turns each list of row dicts in an API payload into one
+array per field, so keys aren't repeated on every row. Timestamp columns are
+sent as unix seconds, delta-encoded: the first value is absolute and every
+later one is the difference from its predecessor, which for a regular time
+series is the same small number over and over. Bodies are then gzip or
+brotli compressed, whichever the client accepts.
+"""
+import gzip
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is used instead
+    brotli = None
+
+DELTA_COLUMNS = ('timestamp',)
+
+
+@lru_cache(maxsize=1024)
+def day_start(day: str) -> int:
+    return int(datetime.fromisoformat(day).replace(tzinfo=timezone.utc).timestamp())
+
+
+def epoch_seconds(value: str) -> int:
+    """'YYYY-MM-DD HH:MM:SS' (naive UTC, as stored) to unix seconds"""
+    # Even a year-long series spans only a few hundred dates, so only the time of day is parsed per row
+    return day_start(value[:10]) + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:19])
+
+
+def delta_encode(values: List[int]) -> List[int]:
+    previous = 0
+    deltas = []
+    for value in values:
+        deltas.append(value - previous)
+        previous = value
+    return deltas
+
+
+def to_columns(rows: List[Dict]) -> Dict:
+    """One array per field; DELTA_COLUMNS become delta-encoded unix seconds"""
+    if not rows:
+        return {'length': 0, 'columns': {}, 'delta_encoded': []}
+
+    fields = list(rows[0])
+    if any(len(row) != len(fields) for row in rows):
+        fields = list(dict.fromkeys(field for row in rows for field in row))
+
+    columns = {}
+    delta_encoded = []
+    for field in fields:
+        values = [row.get(field) for row in rows]
+        if field in DELTA_COLUMNS and None not in values:
+            values = delta_encode([epoch_seconds(value) for value in values])
+            delta_encoded.append(field)
+        columns[field] = values
+    return {'length': len(rows), 'columns': columns, 'delta_encoded': delta_encoded}
+
+
+def columnar_payload(payload: Dict) -> Dict:
+    """Columnar copy of a payload: lists of rows are converted, everything else passes through"""
+    converted = {'format': 'columnar'}
+    for key, value in payload.items():
+        if isinstance(value, list) and all(isinstance(row, dict) for row in value):
+            converted[key] = to_columns(value)
+        else:
+            converted[key] = value
+    return converted
+
+
+def compress_body(body: bytes, accept_encodings, gzip_level: int = 6,
+                  brotli_quality: int = 5) -> Tuple[Optional[str], bytes]:
+    """(Content-Encoding, body) for the best encoding the client accepts, or (None, body)"""
+    if brotli is not None and accept_encodings['br']:
+        return 'br', brotli.compress(body, quality=brotli_quality)
+    if accept_encodings['gzip']:
+        return 'gzip', gzip.compress(body, compresslevel=gzip_level)
+    return None, body
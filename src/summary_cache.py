@@ -0,0 +1,42 @@
+"""
+Precomputed per-guild analytics summaries for Rations Discord Analytics Bot
+"""
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class SummaryCache:
+    """Bounded LRU of the 7-day summary behind the /analytics embed.
+
+    Summaries are refreshed by the collection tick, so slash commands can
+    usually answer from memory without touching SQLite; guilds evicted from
+    a full cache are recomputed on demand.
+    """
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self.entries: 'OrderedDict[int, Dict]' = OrderedDict()
+
+    def get(self, guild_id: int) -> Optional[Dict]:
+        """Get a guild's summary, or None if it hasn't been computed yet"""
+        summary = self.entries.get(guild_id)
+        if summary is not None:
+            self.entries.move_to_end(guild_id)
+        return summary
+
+    def put(self, guild_id: int, summary: Optional[Dict]):
+        """Store a freshly computed summary, evicting the least recently used guild"""
+        if summary is None:
+            self.entries.pop(guild_id, None)
+            return
+        self.entries[guild_id] = summary
+        self.entries.move_to_end(guild_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def discard(self, guild_id: int):
+        """Forget a guild, e.g. after the bot leaves it"""
+        self.entries.pop(guild_id, None)
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -3,29 +3,100 @@ Rations Web Dashboard - Flask Application
 """
 import os
 import sys
+import threading
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, Response, stream_with_context, send_from_directory
+from flask.sessions import SessionInterface
 from urllib.parse import urlencode
 from flask_session import Session
-import requests
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 import json
 
 from config import Config
-from src.database import db
+from src.admission import AdmissionControl, QueryRejected
+from src.database import QueryTimeout, db
+from src.heatmap import HeatmapCache
+from src.live import broadcaster
+from src.response_format import columnar_payload, compress_body
+
+class LazySessionInterface(SessionInterface):
+    """Sets up the Flask-Session store on the first request instead of at import"""
+    
+    def __init__(self, app):
+        self.app = app
+        self.interface = None
+        self.lock = threading.Lock()
+    
+    def get_interface(self):
+        if self.interface is None:
+            with self.lock:
+                if self.interface is None:
+                    # Session() installs the real interface on the app for later requests
+                    Session(self.app)
+                    self.interface = self.app.session_interface
+        return self.interface
+    
+    def open_session(self, app, request):
+        return self.get_interface().open_session(app, request)
+    
+    def save_session(self, app, session, response):
+        return self.get_interface().save_session(app, session, response)
 
 # Create Flask app
 app = Flask(__name__)
 app.config['SECRET_KEY'] = Config.SECRET_KEY
 app.config['SESSION_TYPE'] = 'filesystem'
-Session(app)
+app.session_interface = LazySessionInterface(app)
+
+# Heatmaps change slowly, so recompute them at most once per collection interval
+heatmap_cache = HeatmapCache(db, ttl=Config.ANALYTICS_UPDATE_INTERVAL)
+
+# Caps concurrent long-window queries so one user or guild can't tie up every worker
+query_admission = AdmissionControl(
+    max_per_user=Config.MAX_HEAVY_QUERIES_PER_USER,
+    max_per_guild=Config.MAX_HEAVY_QUERIES_PER_GUILD
+)
 
 # Discord OAuth URLs - use standard discord.com endpoints
 DISCORD_OAUTH_URL = 'https://discord.com/oauth2/authorize'  # Use standard endpoint
 DISCORD_TOKEN_URL = 'https://discord.com/api/oauth2/token'
 DISCORD_API_BASE = 'https://discord.com/api/v10'
 
+_http_client = None
+
+def http_client():
+    """Shared HTTP client for Discord API calls, imported and created on first use"""
+    global _http_client
+    if _http_client is None:
+        import requests
+        _http_client = requests.Session()
+    return _http_client
+
+def valid_days(value):
+    """The requested window if it is a whole number of days the API serves, else None"""
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return None
+    return days if 1 <= days <= Config.MAX_QUERY_DAYS else None
+
+def valid_cursor(args):
+    """The live cursor (`server_id`, `message_id`) requested in `args` if both are whole non-negative ids, else None"""
+    try:
+        cursor = {'server_id': int(args['server_id']), 'message_id': int(args['message_id'])}
+    except (KeyError, TypeError, ValueError):
+        return None
+    return cursor if min(cursor.values()) >= 0 else None
+
+@contextmanager
+def query_limits(user, guild_id, days):
+    """Admission control and a time budget around one request's database reads"""
+    with query_admission.admit(str(user['id']), guild_id, heavy=days > Config.HEAVY_QUERY_DAYS):
+        with db.time_budget(Config.QUERY_TIME_BUDGET):
+            yield
+
 @app.route('/')
 def index():
     """Home page"""
@@ -134,7 +205,7 @@ def oauth_callback():
             'redirect_uri': Config.DISCORD_REDIRECT_URI
         }
         
-        token_response = requests.post(
+        token_response = http_client().post(
             DISCORD_TOKEN_URL,
             data=token_data,
             headers={'Content-Type': 'application/x-www-form-urlencoded'}
@@ -150,7 +221,7 @@ def oauth_callback():
         access_token = token_json['access_token']
         
         # Get user info
-        user_response = requests.get(
+        user_response = http_client().get(
             f'{DISCORD_API_BASE}/users/@me',
             headers={'Authorization': f'Bearer {access_token}'}
         )
@@ -164,7 +235,7 @@ def oauth_callback():
         user_data = user_response.json()
         
         # Get user guilds
-        guilds_response = requests.get(
+        guilds_response = http_client().get(
             f'{DISCORD_API_BASE}/users/@me/guilds',
             headers={'Authorization': f'Bearer {access_token}'}
         )
@@ -224,11 +295,29 @@ def dashboard():
             'name': guild['name'],
             'icon': guild.get('icon'),
             'has_data': len(analytics_data) > 0,
+            'backfill': db.get_backfill_progress(guild_id),
             'permissions': guild.get('permissions', 0)
         }
         bot_guilds.append(guild_info)
     
-    return render_template('dashboard.html', user=user, guilds=bot_guilds)
+    return render_template('dashboard.html', user=user, guilds=bot_guilds,
+                           can_view_reports=str(user['id']) in Config.REPORT_ADMIN_IDS)
+
+@app.route('/reports/<path:filename>')
+def reports(filename):
+    """Cross-guild report snapshots written by run_reports.py (e.g. latest.html, latest.json)"""
+    user = session.get('user')
+    if not user:
+        return redirect(url_for('login'))
+    
+    # Reports cover every guild, so only configured operators may see them
+    if str(user['id']) not in Config.REPORT_ADMIN_IDS:
+        return render_template('error.html',
+            error='Access Denied',
+            message='You do not have access to guild reports.'
+        ), 403
+    
+    return send_from_directory(os.path.abspath(Config.REPORTS_DIR), filename)
 
 @app.route('/analytics/<int:guild_id>')
 def analytics(guild_id):
@@ -247,28 +336,18 @@ def analytics(guild_id):
             message='You do not have access to this server.'
         )
     
-    # Get analytics data
-    try:
-        server_analytics = db.get_server_analytics(guild_id, days=30)
-        message_analytics = db.get_message_analytics(guild_id, days=30)
-        user_activity = db.get_user_activity_stats(guild_id, days=30)
-        
-        return render_template('analytics.html', 
-            guild=guild,
-            server_analytics=server_analytics,
-            message_analytics=message_analytics,
-            user_activity=user_activity
-        )
-    except Exception as e:
-        print(f'Analytics error: {e}')
-        return render_template('error.html',
-            error='Analytics Error',
-            message='Failed to load analytics data.'
-        )
+    # The page loads its data from the API, within that endpoint's limits
+    return render_template('analytics.html', guild=guild)
 
 @app.route('/api/analytics/<int:guild_id>')
 def api_analytics(guild_id):
-    """API endpoint for analytics data"""
+    """API endpoint for analytics data (`?format=columnar` for one array per field).
+    
+    The response's `live_cursor` is where the live stream's deltas pick up:
+    message rows past it are left out, so a page that passes the cursor it
+    last saw on the stream (`?server_id=&message_id=`) can apply every later
+    delta without counting a message twice.
+    """
     user = session.get('user')
     if not user:
         return jsonify({'error': 'Unauthorized'}), 401
@@ -280,19 +359,91 @@ def api_analytics(guild_id):
     if not guild:
         return jsonify({'error': 'Access denied'}), 403
     
-    days = request.args.get('days', 7, type=int)
+    days = valid_days(request.args.get('days', 7))
+    if days is None:
+        return jsonify({'error': f'days must be between 1 and {Config.MAX_QUERY_DAYS}'}), 400
+    
+    live_cursor = None
+    if 'server_id' in request.args or 'message_id' in request.args:
+        live_cursor = valid_cursor(request.args)
+        if live_cursor is None:
+            return jsonify({'error': 'server_id and message_id must both be non-negative integers'}), 400
     
     try:
-        data = {
-            'server_analytics': db.get_server_analytics(guild_id, days),
-            'message_analytics': db.get_message_analytics(guild_id, days),
-            'user_activity': db.get_user_activity_stats(guild_id, days)
-        }
+        with query_limits(user, guild_id, days):
+            live_cursor = live_cursor or db.get_live_cursor()
+            data = {
+                'server_analytics': db.get_server_analytics(guild_id, days),
+                'message_analytics': db.get_message_analytics(guild_id, days, max_id=live_cursor['message_id']),
+                'message_length_percentiles': db.get_message_length_percentiles(guild_id, days),
+                'user_activity': db.get_user_activity_stats(guild_id, days),
+                'anomalies': db.get_anomaly_events(guild_id, days),
+                'live_cursor': live_cursor
+            }
+        if request.args.get('format') == 'columnar':
+            data = columnar_payload(data)
         return jsonify(data)
+    except (QueryRejected, QueryTimeout):
+        raise
     except Exception as e:
         print(f'API analytics error: {e}')
         return jsonify({'error': 'Failed to fetch analytics data'}), 500
 
+@app.route('/api/analytics/<int:guild_id>/heatmap')
+def api_analytics_heatmap(guild_id):
+    """API endpoint for the hour-of-week activity heatmap"""
+    user = session.get('user')
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Check guild access
+    guilds = session.get('guilds', [])
+    guild = next((g for g in guilds if g['id'] == str(guild_id)), None)
+    
+    if not guild:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    days = valid_days(request.args.get('days', 30))
+    if days is None:
+        return jsonify({'error': f'days must be between 1 and {Config.MAX_QUERY_DAYS}'}), 400
+    
+    try:
+        with query_limits(user, guild_id, days):
+            return jsonify(heatmap_cache.get(guild_id, days))
+    except (QueryRejected, QueryTimeout):
+        raise
+    except Exception as e:
+        print(f'API heatmap error: {e}')
+        return jsonify({'error': 'Failed to compute activity heatmap'}), 500
+
+@app.route('/api/analytics/<int:guild_id>/stream')
+def api_analytics_stream(guild_id):
+    """Server-Sent Events stream of analytics snapshots and deltas"""
+    user = session.get('user')
+    if not user:
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    # Check guild access
+    guilds = session.get('guilds', [])
+    guild = next((g for g in guilds if g['id'] == str(guild_id)), None)
+    
+    if not guild:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    subscription = broadcaster.subscribe(guild_id)
+    
+    def generate():
+        try:
+            yield from subscription.events(Config.LIVE_HEARTBEAT_INTERVAL)
+        finally:
+            broadcaster.unsubscribe(subscription)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/trigger-data-collection/<int:guild_id>', methods=['POST'])
 def trigger_data_collection(guild_id):
     """Trigger immediate data collection for a guild"""
@@ -326,6 +477,41 @@ def trigger_data_collection(guild_id):
         print(f'Data collection trigger error: {e}')
         return jsonify({'error': 'Failed to trigger data collection'}), 500
 
+@app.after_request
+def compress_response(response):
+    """gzip (or brotli) JSON responses for clients that accept it"""
+    if (response.direct_passthrough or response.is_streamed or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    body = response.get_data()
+    if len(body) < Config.API_COMPRESS_MIN_BYTES:
+        return response
+    
+    encoding, compressed = compress_body(body, request.accept_encodings,
+                                         gzip_level=Config.API_GZIP_LEVEL, brotli_quality=Config.API_BROTLI_QUALITY)
+    response.vary.add('Accept-Encoding')
+    if encoding is not None:
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+@app.errorhandler(QueryRejected)
+def query_rejected(error):
+    """Heavy query over the user's or guild's concurrency cap"""
+    response = jsonify({'error': 'Too many long-range queries in progress, try again shortly', 'scope': error.scope})
+    response.headers['Retry-After'] = '5'
+    return response, 429
+
+@app.errorhandler(QueryTimeout)
+def query_timeout(error):
+    """Reads interrupted at their time budget; logged so expensive access patterns show up"""
+    user = session.get('user') or {}
+    print(f"⏱️ Query timeout after {error.budget:g}s: {request.full_path} (user {user.get('id')})")
+    response = jsonify({'error': 'Query too expensive, try a shorter range', 'budget_seconds': error.budget})
+    response.headers['Retry-After'] = '30'
+    return response, 503
+
 @app.errorhandler(404)
 def not_found(error):
     """404 error handler"""
@@ -5,21 +5,19 @@ This script allows you to run both the Discord bot and web dashboard together
 """
 
 import asyncio
-import threading
 import sys
 import os
-import time
-from multiprocessing import Process
+from multiprocessing import Event, Process
 
 # Add src directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-def run_bot():
+def run_bot(ready_event=None):
     """Run the Discord bot in a separate process"""
     try:
         from src.bot import main
         print("🤖 Starting Discord Bot...")
-        asyncio.run(main())
+        asyncio.run(main(ready_event))
     except Exception as e:
         print(f"❌ Bot error: {e}")
 
@@ -38,6 +36,17 @@ def run_web():
     except Exception as e:
         print(f"❌ Web app error: {e}")
 
+def wait_for_ready(ready_event, process, timeout):
+    """Wait for a child process to signal readiness; False on timeout or early exit"""
+    waited = 0.0
+    while waited < timeout:
+        if ready_event.wait(0.1):
+            return True
+        if not process.is_alive():
+            return False
+        waited += 0.1
+    return ready_event.is_set()
+
 def main():
     """Main function to start both services"""
     print("🚀 Starting Rations - Discord Server Analytics")
@@ -62,18 +71,24 @@ def main():
     print("=" * 50)
     
     # Start bot and web app in separate processes
-    bot_process = Process(target=run_bot)
+    bot_ready = Event()
+    bot_process = Process(target=run_bot, args=(bot_ready,))
     web_process = Process(target=run_web)
     
     try:
-        # Start both processes
+        # The dashboard doesn't depend on the bot, so both start at once; the handshake only reports the bot's status
         bot_process.start()
-        time.sleep(2)  # Give bot time to start
         web_process.start()
+        bot_online = wait_for_ready(bot_ready, bot_process, Config.STARTUP_READY_TIMEOUT)
         
         print("✅ Both services started successfully!")
         print("📊 Web Dashboard: http://localhost:5000")
-        print("🤖 Discord Bot: Online and ready")
+        if bot_online:
+            print("🤖 Discord Bot: Online and ready")
+        elif not bot_process.is_alive():
+            print("❌ Discord Bot: exited during startup")
+        else:
+            print(f"⚠️ Discord Bot: not ready after {Config.STARTUP_READY_TIMEOUT}s, still starting")
         print("\nPress Ctrl+C to stop both services...")
         
         # Wait for both processes